@@ -0,0 +1,110 @@
+"""Headless batch checker: python -m app.check [options] PATH [PATH ...]
+
+Runs the same extraction and analysis pipeline as the Paper Check interface
+without importing Qt, writing one JSON object per checked file.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+
+from app.common.batch_check import BatchChecker
+from app.common.content_index import ContentIndex
+from app.common.job_queue import JobQueue, DONE, FAILED, CANCELLED
+from app.common.paper_check import configure_service
+from app.common.response_cache import ResponseCache
+from app.common.text_cache import TextCache
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nobleblocks")
+
+
+def expand_paths(patterns, recursive=False):
+    """Expand files, glob patterns and folders into a de-duplicated list of PDF paths"""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*.pdf") if recursive else os.path.join(pattern, "*.pdf")
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            path = os.path.abspath(path)
+            if path not in seen and path.lower().endswith(".pdf"):
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.check", description="Check scientific papers for errors")
+    parser.add_argument("paths", nargs="*", help="PDF files, glob patterns or folders")
+    parser.add_argument("-r", "--recursive", action="store_true", help="search folders recursively")
+    parser.add_argument("-j", "--workers", type=int, default=4, help="papers checked at the same time")
+    parser.add_argument("--extract-workers", type=int, default=1, help="processes used to extract one PDF")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="concurrent analysis requests")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="folder for caches and the job queue")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="do not read or write the text and response caches, or reuse earlier results")
+    parser.add_argument("--resume", action="store_true", help="also run unfinished jobs from the job queue")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"),
+                        help="API key (default: $OPENAI_API_KEY, then app.common.secrets)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = expand_paths(args.paths, args.recursive)
+    if not paths and not args.resume:
+        print("No PDF files found", file=sys.stderr)
+        return 2
+
+    configure_service(api_key=args.api_key, max_in_flight=args.max_in_flight)
+    text_cache = response_cache = None
+    if not args.no_cache:
+        text_cache = TextCache(os.path.join(args.cache_dir, "pdf_text.db"),
+                               index=ContentIndex(os.path.join(args.cache_dir, "content.db")))
+        response_cache = ResponseCache(os.path.join(args.cache_dir, "responses.db"))
+    queue = JobQueue(os.path.join(args.cache_dir, "jobs.db"))
+
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    lock = threading.Lock()
+
+    def on_status(item):
+        if item.status not in (DONE, FAILED, CANCELLED):
+            return
+        record = {
+            "path": item.path,
+            "status": item.status,
+            "extract_time": round(item.extract_time, 3),
+            "analyse_time": round(item.analyse_time, 3),
+            "result": item.result,
+            "error": item.error,
+        }
+        with lock:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+    options = dict(workers=args.workers, extract_workers=args.extract_workers, cache=text_cache,
+                   response_cache=response_cache, on_status=on_status, reuse_results=not args.no_cache)
+    if args.resume:
+        # Enqueue first so the new paths run after older unfinished jobs, in one pass
+        queue.enqueue(paths)
+        checker = BatchChecker.resume(queue, **options)
+    else:
+        checker = BatchChecker(paths, queue=queue, **options)
+
+    try:
+        items = checker.run()
+    except KeyboardInterrupt:
+        checker.cancel()
+        return 130
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if any(item.status == FAILED for item in items) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
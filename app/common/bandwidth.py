@@ -0,0 +1,60 @@
+import asyncio
+import time
+from datetime import datetime
+
+# Longest single wait, so a schedule change or a new window is noticed quickly
+MAX_WAIT = 0.25
+
+
+class BandwidthLimiter:
+    """ Token bucket shared by every download stream, with rates per time of day
+
+    windows is a list of (start_minute, end_minute, bytes_per_second) counted
+    from midnight; a window whose start is after its end wraps past midnight.
+    The first window containing the current time wins, otherwise default_rate
+    applies. A rate of 0 means unlimited. The schedule can be replaced from
+    another thread while downloads are running.
+    """
+
+    def __init__(self, windows=(), default_rate=0, clock=time.monotonic, now=datetime.now):
+        self.clock = clock
+        self.now = now
+        self.windows = tuple(windows)
+        self.default_rate = default_rate
+        self.tokens = 0.0
+        self.updated = clock()
+
+    def set_schedule(self, windows, default_rate=0):
+        self.windows, self.default_rate = tuple(windows), default_rate
+
+    def current_rate(self):
+        now = self.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, rate in self.windows:
+            inside = start <= minute < end if start <= end else minute >= start or minute < end
+            if inside:
+                return rate
+        return self.default_rate
+
+    async def consume(self, size):
+        """Wait until size bytes may be transferred at the current rate"""
+        while True:
+            rate = self.current_rate()
+            now = self.clock()
+            if not rate:
+                self.tokens, self.updated = 0.0, now
+                return
+            # At most one second of burst; a chunk larger than that runs the bucket into debt
+            self.tokens = min(rate, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            if self.tokens > 0:
+                self.tokens -= size
+                return
+            await asyncio.sleep(min(-self.tokens / rate + 1e-3, MAX_WAIT))
+
+
+def daily_schedule(start_hour, end_hour, day_rate, night_rate):
+    """Windows for one daytime rate between start_hour and end_hour and night_rate otherwise"""
+    if start_hour == end_hour:
+        return [], night_rate
+    return [(start_hour * 60, end_hour * 60, day_rate)], night_rate
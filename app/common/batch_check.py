@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.common.job_queue import QUEUED, EXTRACTING, ANALYSING, DONE, FAILED, CANCELLED
+from app.common.paper_check import analyze_pages, iter_pages
+from app.common.text_cache import file_digest
+
+
+class BatchItem:
+    """ State and result of one file in a batch check """
+
+    def __init__(self, path, job_id=None):
+        self.path = path
+        self.job_id = job_id
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.extract_time = 0.0
+        self.analyse_time = 0.0
+
+    @property
+    def elapsed(self):
+        return self.extract_time + self.analyse_time
+
+
+class BatchChecker:
+    """ Check many PDFs with a bounded pool of workers
+
+    Each worker extracts a file and then waits on its analysis, so with several
+    workers the extraction of some files overlaps the LLM calls of others.
+    on_status(item) is called from worker threads whenever an item changes state.
+    With a JobQueue every state change is also recorded there, and files whose
+    content was already checked reuse the stored result unless reuse_results
+    is False.
+    """
+
+    def __init__(self, paths, workers=4, extract_workers=1, cache=None,
+                 response_cache=None, on_status=None, queue=None, reuse_results=True):
+        if queue is not None:
+            self.items = [BatchItem(path, job_id)
+                          for job_id, path in zip(queue.enqueue(paths), paths)]
+        else:
+            self.items = [BatchItem(path) for path in paths]
+        self.queue = queue
+        self.workers = workers
+        self.extract_workers = extract_workers
+        self.cache = cache
+        self.response_cache = response_cache
+        self.on_status = on_status
+        self.reuse_results = reuse_results
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def resume(cls, queue, **options):
+        """Create a checker for the incomplete jobs in queue, oldest first"""
+        checker = cls([], queue=queue, **options)
+        checker.items = [BatchItem(path, job_id) for job_id, path in queue.pending()]
+        return checker
+
+    def cancel(self):
+        """Stop picking up queued files; files already being checked still finish"""
+        self._cancelled.set()
+        if self.queue is not None:
+            # Recorded at once, so the queued jobs are not resumed if the app quits before they drain
+            self.queue.cancel_pending([item.job_id for item in self.items if item.job_id is not None])
+
+    def _set_status(self, item, status, **fields):
+        item.status = status
+        if self.queue is not None and item.job_id is not None:
+            self.queue.update(item.job_id, state=status, **fields)
+        if self.on_status:
+            self.on_status(item)
+
+    def _check(self, item):
+        if self._cancelled.is_set():
+            self._set_status(item, CANCELLED)
+            return item
+        try:
+            self._set_status(item, EXTRACTING, started_at=time.time())
+            if self.queue is not None:
+                digest = self.cache.digest(item.path) if self.cache else file_digest(item.path)
+                item.result = self.queue.result_for_digest(digest) if self.reuse_results else None
+                if item.result is not None:
+                    self._set_status(item, DONE, digest=digest, result=item.result,
+                                     finished_at=time.time())
+                    return item
+                self.queue.update(item.job_id, digest=digest)
+
+            start = time.perf_counter()
+            pages = list(iter_pages(item.path, self.extract_workers, self.cache))
+            item.extract_time = time.perf_counter() - start
+
+            self._set_status(item, ANALYSING, extract_time=item.extract_time)
+            start = time.perf_counter()
+            item.result = analyze_pages(pages, self.response_cache)
+            item.analyse_time = time.perf_counter() - start
+            self._set_status(item, DONE, result=item.result, analyse_time=item.analyse_time,
+                             finished_at=time.time())
+        except Exception as e:
+            item.error = str(e)
+            self._set_status(item, FAILED, error=item.error, finished_at=time.time())
+        return item
+
+    def run(self):
+        """Check every file and return the list of BatchItem in input order"""
+        for item in self.items:
+            item.status = QUEUED
+            if self.on_status:
+                self.on_status(item)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self._check, self.items))
+        return self.items
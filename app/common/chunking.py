@@ -0,0 +1,63 @@
+import re
+from collections import namedtuple
+
+Chunk = namedtuple("Chunk", ["text", "first_page", "last_page"])
+
+# Rough size of one token in characters for English prose
+CHARS_PER_TOKEN = 4
+
+# Headings such as "3 Methods", "2.1 Data", "IV. RESULTS", "Abstract" or "REFERENCES" on their own line
+SECTION_RE = re.compile(
+    r"^(?:(?:\d+(?:\.\d+)*|[IVXLC]+)\.?\s+[A-Z][^\n]{0,80}"
+    r"|(?:abstract|introduction|related work|background|methods?|methodology|results|"
+    r"discussion|conclusions?|references|bibliography|appendix|acknowledge?ments?)\b[^\n]{0,40})$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_sections(text):
+    """Split text in front of every section heading"""
+    starts = [m.start() for m in SECTION_RE.finditer(text) if m.start() > 0]
+    bounds = [0] + starts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:]) if text[a:b]]
+
+
+def _split_oversized(text, max_chars):
+    """Split text larger than max_chars on paragraph, then line, then hard boundaries"""
+    if len(text) <= max_chars:
+        return [text]
+    for separator in ("\n\n", "\n"):
+        cut = text.rfind(separator, 0, max_chars)
+        if cut > max_chars // 2:
+            cut += len(separator)
+            return [text[:cut]] + _split_oversized(text[cut:], max_chars)
+    return [text[:max_chars]] + _split_oversized(text[max_chars:], max_chars)
+
+
+def chunk_pages(pages, token_budget):
+    """Pack (page_index, text) pairs into chunks of at most token_budget tokens
+
+    Chunks only break on section or page boundaries unless a single section is
+    larger than the budget on its own.
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN
+    chunks = []
+    parts, size, first, last = [], 0, None, None
+    for index, page_text in pages:
+        for section in split_sections(page_text):
+            for piece in _split_oversized(section, max_chars):
+                if parts and size + len(piece) > max_chars:
+                    chunks.append(Chunk("".join(parts), first, last))
+                    parts, size, first = [], 0, None
+                if first is None:
+                    first = index
+                parts.append(piece)
+                size += len(piece)
+                last = index
+    if parts:
+        chunks.append(Chunk("".join(parts), first, last))
+    return chunks
@@ -6,6 +6,8 @@ from qfluentwidgets import (QConfig, ConfigItem, OptionsConfigItem, BoolValidato
                             OptionsValidator, RangeConfigItem, RangeValidator,
                             FolderValidator, ConfigValidator, ConfigSerializer)
 
+from .mirrors import DEFAULT_MIRRORS
+
 class GeometryValidator(ConfigValidator):  
     def validate(self, value: QRect) -> bool:
         if value == "Default":
@@ -35,7 +37,20 @@ class Config(QConfig):
         "Download", "DownloadFolder", QDir.currentPath(), FolderValidator())
 
     maxBlockNum = RangeConfigItem("Download", "MaxBlockNum", 8, RangeValidator(1, 256))
+    perHostConnections = RangeConfigItem("Download", "PerHostConnections", 4, RangeValidator(1, 64))
     autoSpeedUp = ConfigItem("Download", "AutoSpeedUp", True, BoolValidator())
+    # Bandwidth limits in KB/s (0 = unlimited): dayRateLimit between the two hours, nightRateLimit otherwise
+    limitStartHour = RangeConfigItem("Download", "LimitStartHour", 9, RangeValidator(0, 23))
+    limitEndHour = RangeConfigItem("Download", "LimitEndHour", 18, RangeValidator(0, 24))
+    dayRateLimit = RangeConfigItem("Download", "DayRateLimit", 2048, RangeValidator(0, 51200))
+    nightRateLimit = RangeConfigItem("Download", "NightRateLimit", 0, RangeValidator(0, 51200))
+    scihubMirrors = ConfigItem("Download", "ScihubMirrors", list(DEFAULT_MIRRORS))
+
+    # paper check
+    extractWorkers = RangeConfigItem("Check", "ExtractWorkers", 4, RangeValidator(1, 64))
+    maxInFlight = RangeConfigItem("Check", "MaxInFlight", 8, RangeValidator(1, 64))
+    batchWorkers = RangeConfigItem("Check", "BatchWorkers", 4, RangeValidator(1, 64))
+    scanSubfolders = ConfigItem("Check", "ScanSubfolders", False, BoolValidator())
 
     # personalization
     if sys.platform == "win32":
@@ -0,0 +1,107 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+import httpx
+
+
+class FairSlots:
+    """ A counting semaphore that hands free slots to its owners in round-robin order
+
+    Waiters are queued per owner (e.g. one download engine per query) and each
+    grant moves that owner to the back of the line, so an owner with hundreds
+    of waiting papers gets no more than its turn.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.in_use = 0
+        # owner -> deque of futures, in turn order
+        self._waiters = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, owner):
+        await self.acquire(owner)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, owner):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(owner, deque()).append(future)
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just before the cancellation arrived: give the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.in_use -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.in_use < self.capacity and self._waiters:
+            owner, queue = self._waiters.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                self._waiters[owner] = queue
+            # Cancelled waiters are dropped when their turn comes
+            if not future.done():
+                self.in_use += 1
+                future.set_result(None)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """ Response body that frees its host slot when the response is closed """
+
+    def __init__(self, stream, semaphore):
+        self.stream = stream
+        self.semaphore = semaphore
+        self.released = False
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if not self.released:
+                self.released = True
+                self.semaphore.release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """ Transport wrapper allowing at most per_host open responses to any one host
+
+    A slot is held from sending the request until the response is closed, so
+    streamed downloads count for as long as they run.
+    """
+
+    def __init__(self, transport, per_host):
+        self.transport = transport
+        self.per_host = per_host
+        self._semaphores = {}
+
+    async def handle_async_request(self, request):
+        host = request.url.host
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        await semaphore.acquire()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_ReleasingStream(response.stream, semaphore),
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,143 @@
+import html
+import os
+import sqlite3
+import threading
+import time
+
+from app.common.sqlite_store import connect
+
+# Pages fetched per search before they are grouped into papers
+SEARCH_PAGES = 2000
+# Markers snippet() puts around matched terms, turned into <b> by highlight()
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word required, the last one as a prefix
+
+    Each word is quoted, so punctuation such as the dash in "ResNet-50" makes
+    a phrase instead of an FTS5 operator.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    if terms and text[-1:].isalnum():
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight(snippet):
+    """HTML for a snippet with its matched terms in bold"""
+    return html.escape(snippet).replace(MATCH_START, "<b>").replace(MATCH_END, "</b>")
+
+
+class ContentIndex:
+    """ SQLite FTS5 index over the text of every page extracted so far
+
+    Documents are keyed by content digest like in TextCache, which feeds
+    this index as it stores pages, and a (path, digest) table maps them back
+    to files. search() ranks pages by BM25 and keeps the best page of each
+    paper; snippet() cuts the text around the matched terms out of a page.
+    Each thread keeps one connection open, as the list asks for a snippet
+    per row it paints.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+                    text, digest UNINDEXED, idx UNINDEXED, tokenize = 'porter unicode61');
+                CREATE TABLE IF NOT EXISTS docs (digest TEXT PRIMARY KEY, indexed REAL);
+                CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, digest TEXT);
+                CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+            """)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_path)
+        return conn
+
+    def has(self, digest):
+        return self._connection().execute("SELECT 1 FROM docs WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def add(self, digest, pages):
+        """Index [(page_index, text)] for digest unless it is indexed already"""
+        with self._lock, self._connection() as conn:
+            if conn.execute("SELECT 1 FROM docs WHERE digest = ?", (digest,)).fetchone():
+                return
+            conn.executemany("INSERT INTO pages (text, digest, idx) VALUES (?, ?, ?)",
+                             ((text, digest, i) for i, text in pages))
+            conn.execute("INSERT INTO docs VALUES (?, ?)", (digest, time.time()))
+
+    def link(self, path, digest):
+        """Record that the file at path has the content digest"""
+        path = os.path.abspath(path)
+        with self._lock, self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (path, digest))
+
+    def prune(self):
+        """Forget files that no longer exist and the pages of digests no file links to"""
+        conn = self._connection()
+        paths = [path for path, in conn.execute("SELECT path FROM files")]
+        gone = [(path,) for path in paths if not os.path.exists(path)]
+        with self._lock, conn:
+            conn.executemany("DELETE FROM files WHERE path = ?", gone)
+            conn.execute("CREATE TEMP TABLE orphans AS SELECT digest FROM docs "
+                         "WHERE digest NOT IN (SELECT digest FROM files)")
+            conn.execute("DELETE FROM pages WHERE digest IN (SELECT digest FROM orphans)")
+            conn.execute("DELETE FROM docs WHERE digest IN (SELECT digest FROM orphans)")
+            conn.execute("DROP TABLE orphans")
+
+    def search(self, text, folder=None, limit=200):
+        """Return [(path, page_index, rowid)] for the best matching papers, best first
+
+        Only files under folder are returned when it is given. Snippets are
+        left to snippet(), which the list calls for the rows it shows.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        conn = self._connection()
+        try:
+            pages = conn.execute("SELECT digest, idx, rowid FROM pages WHERE pages MATCH ? "
+                                 "ORDER BY rank LIMIT ?", (query, SEARCH_PAGES)).fetchall()
+        except sqlite3.OperationalError:
+            # A query FTS5 cannot parse matches nothing
+            return []
+        best = {}
+        for digest, idx, rowid in pages:
+            best.setdefault(digest, (idx, rowid))
+        paths = {}
+        digests = list(best)
+        for start in range(0, len(digests), 500):
+            chunk = digests[start:start + 500]
+            for path, digest in conn.execute(
+                    f"SELECT path, digest FROM files WHERE digest IN ({','.join('?' * len(chunk))})", chunk):
+                paths.setdefault(digest, []).append(path)
+
+        prefix = os.path.join(os.path.abspath(folder), "") if folder else ""
+        results = []
+        for digest, (idx, rowid) in best.items():
+            for path in paths.get(digest, ()):
+                if path.startswith(prefix):
+                    results.append((path, idx, rowid))
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def snippet(self, text, rowid):
+        """Text around the matches of a search for text on the page rowid, or None
+
+        Matched terms are wrapped in MATCH_START and MATCH_END; see highlight().
+        """
+        conn = self._connection()
+        try:
+            row = conn.execute("SELECT snippet(pages, 0, ?, ?, '…', 12) FROM pages "
+                               "WHERE pages MATCH ? AND rowid = ?",
+                               (MATCH_START, MATCH_END, fts_query(text), rowid)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
@@ -0,0 +1,405 @@
+import asyncio
+import os
+import time
+from collections import namedtuple
+from contextlib import aclosing, contextmanager
+
+import httpx
+from loguru import logger
+
+from app.common.bandwidth import BandwidthLimiter
+from app.common.connection_budget import FairSlots, HostLimitedTransport
+from app.common.download_state import DownloadCheckpoint
+from app.common.mirrors import MirrorManager, MirrorUnavailable
+from app.common.paper_index import PaperIndex
+from app.common.paper_search import PaperRecord, resolve_doi, resolve_scihub_pdf, search_scholar
+from app.common.segmented_download import IncompleteDownload, RangeNotSupported, SegmentedDownload
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/126.0 Safari/537.36")
+CHUNK_SIZE = 64 * 1024
+
+# Files at least this large are fetched in parallel Range segments when the server allows it
+SEGMENT_THRESHOLD = 4 * 1024 * 1024
+
+# Seconds between checkpoints while downloading, so a crash loses little progress
+CHECKPOINT_INTERVAL = 5.0
+
+# Minimum seconds between two BYTES events for the same paper
+PROGRESS_INTERVAL = 0.25
+
+# Kinds of DownloadEvent, in the order a paper goes through them
+QUEUED = "queued"
+STARTED = "started"
+BYTES = "bytes"
+DONE = "done"
+SKIPPED_DUPLICATE = "skipped-duplicate"
+FAILED = "failed"
+
+# Open responses allowed to any one host across all running queries
+PER_HOST_CONNECTIONS = 4
+
+# received/total are byte counts; path is the saved file (or the existing copy for
+# SKIPPED_DUPLICATE); elapsed is set on DONE and error on FAILED; query is the run's query
+DownloadEvent = namedtuple("DownloadEvent", "kind paper received total path error elapsed query",
+                           defaults=(0, 0, None, None, None, None))
+
+
+class DownloadSession:
+    """ Resources shared by every DownloadEngine running on one event loop
+
+    One pooled client capped at max_connections, with at most per_host open
+    responses to any one host; FairSlots that hand those connections to the
+    engines in turn; the mirror manager and its background probes; the
+    folder's PaperIndex; the filenames being written, so that two queries
+    never write the same file; and the BandwidthLimiter every stream draws from.
+    """
+
+    def __init__(self, dest, max_connections=8, per_host=PER_HOST_CONNECTIONS, mirrors=None,
+                 bandwidth=None):
+        self.dest = dest
+        self.max_connections = max_connections
+        self.per_host = per_host
+        # A list of mirror URLs or a ready MirrorManager
+        self.mirrors = mirrors if isinstance(mirrors, MirrorManager) else MirrorManager(mirrors)
+        self.slots = FairSlots(max_connections)
+        self.bandwidth = bandwidth or BandwidthLimiter()
+        self.claimed = set()
+        self.client = None
+        self.index = None
+        self._prober = None
+
+    def _create_client(self):
+        limits = httpx.Limits(max_connections=self.max_connections,
+                              max_keepalive_connections=self.max_connections)
+        return httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            transport=HostLimitedTransport(httpx.AsyncHTTPTransport(limits=limits), self.per_host),
+            # Segments of different papers wait for a free pooled connection instead of failing
+            timeout=httpx.Timeout(60.0, connect=15.0, pool=None),
+        )
+
+    async def __aenter__(self):
+        os.makedirs(self.dest, exist_ok=True)
+        self.index = PaperIndex(self.dest)
+        # Hashing the folder's PDFs must not stall the event loop
+        await asyncio.to_thread(self.index.sync)
+        self.client = self._create_client()
+        self._prober = asyncio.ensure_future(self.mirrors.run_probes(self.client))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._prober.cancel()
+        await self.client.aclose()
+
+
+class DownloadEngine:
+    """ Search Google Scholar and download the papers it finds, in-process
+
+    Papers are fetched concurrently over the pooled client of a DownloadSession,
+    taking turns with any other engine in the same session for its connection
+    slots, and large files are split into up to max_segments Range requests,
+    scaled by throughput when auto_speed_up is set. Mirror lookups go to the
+    fastest healthy mirror. on_event(DownloadEvent) is called from the engine's
+    event loop; BYTES events are throttled to one per PROGRESS_INTERVAL for each
+    paper.
+    """
+
+    def __init__(self, dest, max_connections=8, mirrors=None, on_event=None,
+                 max_segments=None, auto_speed_up=True, search_cache=None,
+                 per_host=PER_HOST_CONNECTIONS, bandwidth=None):
+        self.dest = dest
+        self.max_connections = max_connections
+        self.max_segments = max_segments or max_connections
+        self.auto_speed_up = auto_speed_up
+        self.search_cache = search_cache
+        self.per_host = per_host
+        self.mirrors = mirrors
+        self.bandwidth = bandwidth
+        self.on_event = on_event
+        self.session = None
+        self.client = None
+        self.checkpoint = None
+        self.index = None
+        self._query = None
+        self._pages = None
+        self._min_year = None
+        self._remaining = []
+        self._resume_partial = {}
+        # filename -> (url, total, callable returning the missing ranges)
+        self._in_flight = {}
+        # filename -> time of the last BYTES event
+        self._bytes_reported = {}
+
+    def _emit(self, kind, paper, **fields):
+        if self.on_event:
+            self.on_event(DownloadEvent(kind, paper, query=self._query, **fields))
+
+    def _report_bytes(self, paper, received, total, force=False):
+        now = time.monotonic()
+        if force or now - self._bytes_reported.get(paper.filename, 0.0) >= PROGRESS_INTERVAL:
+            self._bytes_reported[paper.filename] = now
+            self._emit(BYTES, paper, received=received, total=total)
+
+    def paused_queries(self):
+        """Queries with an unfinished run in the download folder, newest first"""
+        return [state["query"] for _, state in DownloadCheckpoint.saved(self.dest)]
+
+    def can_resume(self, query=None):
+        """Return the saved query if there is an unfinished run for it (or for any query if None)"""
+        if query is None:
+            return next(iter(self.paused_queries()), None)
+        return query if DownloadCheckpoint.find(self.dest, query) else None
+
+    def discard(self, query=None):
+        """Forget the unfinished run of query (of every query if None) and delete its partial files"""
+        for checkpoint, state in DownloadCheckpoint.saved(self.dest):
+            if query is not None and state["query"] != query:
+                continue
+            for filename in state.get("partial", {}):
+                part_path = os.path.join(self.dest, filename + ".part")
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+            checkpoint.clear()
+
+    def save_checkpoint(self):
+        partial = {}
+        for filename, (url, total, progress) in self._in_flight.items():
+            segments = progress()
+            if segments:
+                partial[filename] = {"url": url, "total": total, "segments": segments}
+        self.checkpoint.save({
+            "query": self._query,
+            "pages": self._pages,
+            "min_year": self._min_year,
+            "remaining": [paper.to_dict() for paper in self._remaining],
+            "partial": partial,
+        })
+
+    async def _checkpoint_periodically(self):
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            self.save_checkpoint()
+
+    async def run(self, query, pages, min_year=None, session=None):
+        """Search and download every result, resuming a paused run of the same query
+
+        Without a session the engine opens one of its own for the run. Cancelling
+        the task pauses the run: the checkpoint is saved first so that a later
+        run() of the same query continues where this one stopped.
+        """
+        if session is None:
+            async with DownloadSession(self.dest, self.max_connections, self.per_host,
+                                       self.mirrors, self.bandwidth) as session:
+                return await self.run(query, pages, min_year, session)
+
+        self.session = session
+        self.client, self.index, self.mirrors = session.client, session.index, session.mirrors
+        self._query, self._pages, self._min_year = query, pages, min_year
+        found = DownloadCheckpoint.find(self.dest, query)
+        if found:
+            self.checkpoint, state = found
+            self._resume_partial = state.get("partial", {})
+            papers = [PaperRecord.from_dict(data) for data in state["remaining"]]
+        else:
+            self.checkpoint = DownloadCheckpoint.for_query(self.dest, query)
+            self._resume_partial = {}
+            papers = await search_scholar(self.client, query, pages, min_year, self.search_cache)
+
+        self._remaining = list(papers)
+        self.save_checkpoint()
+        saver = asyncio.ensure_future(self._checkpoint_periodically())
+        try:
+            await self.download_all(papers)
+        except asyncio.CancelledError:
+            self.save_checkpoint()
+            raise
+        finally:
+            saver.cancel()
+        self.checkpoint.clear()
+        return papers
+
+    async def download_all(self, papers):
+        for paper in papers:
+            self._emit(QUEUED, paper)
+        await asyncio.gather(*(self.download(paper) for paper in papers))
+
+    async def download(self, paper):
+        async with self.session.slots.slot(self):
+            try:
+                path = await self._download(paper)
+            except asyncio.CancelledError:
+                # Paused: the paper stays in the checkpoint's remaining list
+                raise
+            except Exception as e:
+                logger.warning(f"Download of '{paper.title}' failed: {e}")
+                self._emit(FAILED, paper, error=str(e))
+                path = None
+            self._bytes_reported.pop(paper.filename, None)
+            if paper in self._remaining:
+                self._remaining.remove(paper)
+            return path
+
+    async def _download(self, paper):
+        existing = self.index.find(paper)
+        path = os.path.join(self.dest, paper.filename)
+        if not existing and paper.filename in self.session.claimed:
+            # Another query of this session is writing the same file right now
+            existing = paper.filename
+        if existing:
+            self._emit(SKIPPED_DUPLICATE, paper, path=os.path.join(self.dest, existing))
+            return None
+        self._emit(STARTED, paper)
+        start = time.monotonic()
+        self.session.claimed.add(paper.filename)
+        try:
+            received = await self._resume(paper, path) or await self._fetch_any(paper, path)
+            # A different title or DOI can still turn out to be a file we already have.
+            # Hashing runs off the event loop; the claim holds until the file is indexed
+            duplicate = await asyncio.to_thread(self.index.add, paper, path) if received else None
+        finally:
+            self.session.claimed.discard(paper.filename)
+        if not received:
+            self._emit(FAILED, paper, error="No downloadable PDF found")
+            return None
+
+        if duplicate:
+            os.remove(path)
+            self._emit(SKIPPED_DUPLICATE, paper, path=os.path.join(self.dest, duplicate))
+            return None
+        self._emit(DONE, paper, received=received, total=received, path=path,
+                   elapsed=time.monotonic() - start)
+        return path
+
+    async def _fetch_any(self, paper, path):
+        async with aclosing(self._candidate_urls(paper)) as urls:
+            async for url in urls:
+                try:
+                    received = await self._fetch(paper, url, path)
+                except (httpx.HTTPError, IncompleteDownload) as e:
+                    logger.warning(f"Fetching '{paper.title}' from {url} failed: {e}")
+                    continue
+                if received:
+                    return received
+        return None
+
+    async def _candidate_urls(self, paper):
+        """URLs to try in order: the direct PDF link, then the mirror copy found by DOI
+
+        The DOI and the mirror are only looked up once the direct link has failed.
+        """
+        if paper.pdf_url:
+            yield paper.pdf_url
+        try:
+            doi = await resolve_doi(self.client, paper)
+        except httpx.HTTPError as e:
+            logger.warning(f"DOI lookup for '{paper.title}' failed: {e}")
+            return
+        if not doi:
+            return
+        try:
+            pdf_url = await self.mirrors.call(lambda mirror: resolve_scihub_pdf(self.client, mirror, doi))
+        except MirrorUnavailable as e:
+            logger.warning(f"No mirror could resolve {doi}: {e}")
+            return
+        if pdf_url:
+            yield pdf_url
+
+    @contextmanager
+    def _tracking(self, paper, url, total, missing):
+        """Register a file as in flight so a pause can checkpoint the ranges still missing"""
+        self._in_flight[paper.filename] = (url, total, missing)
+        try:
+            yield
+        except asyncio.CancelledError:
+            # Keep the entry: run() saves the checkpoint after the downloads unwind
+            raise
+        except BaseException:
+            self._in_flight.pop(paper.filename, None)
+            raise
+        self._in_flight.pop(paper.filename, None)
+
+    async def _segmented(self, paper, url, part_path, total, **options):
+        download = SegmentedDownload(self.client, url, part_path, total, self.max_segments,
+                                     self.auto_speed_up,
+                                     on_bytes=lambda received, size: self._report_bytes(paper, received, size),
+                                     throttle=self.session.bandwidth.consume, **options)
+        with self._tracking(paper, url, total, download.checkpoint):
+            return await download.run()
+
+    async def _stream_rest(self, paper, url, chunks, part_path, offset, total):
+        """Append the remaining chunks to part_path; a pause resumes them with a Range request"""
+        received = offset
+        with self._tracking(paper, url, total, lambda: [(received, None)]):
+            with open(part_path, "ab") as f:
+                async for chunk in chunks:
+                    await self.session.bandwidth.consume(len(chunk))
+                    f.write(chunk)
+                    received += len(chunk)
+                    self._report_bytes(paper, received, total)
+        return received
+
+    async def _resume(self, paper, path):
+        """Continue a partial file from a paused run; return its size, or None to start over"""
+        saved = self._resume_partial.pop(paper.filename, None)
+        part_path = path + ".part"
+        if not saved or not os.path.exists(part_path):
+            return None
+
+        url, total, segments = saved["url"], saved["total"], saved["segments"]
+        if segments[0][1] is not None:
+            self._report_bytes(paper, total - sum(end - pos for pos, end in segments), total, force=True)
+            try:
+                received = await self._segmented(paper, url, part_path, total, segments=segments)
+            except RangeNotSupported:
+                return None
+        else:
+            offset = os.path.getsize(part_path)
+            async with self.client.stream("GET", url, headers={"Range": f"bytes={offset}-"}) as response:
+                if response.status_code != 206:
+                    return None
+                self._report_bytes(paper, offset, total, force=True)
+                received = await self._stream_rest(paper, url, response.aiter_bytes(CHUNK_SIZE),
+                                                   part_path, offset, total)
+
+        os.replace(part_path, path)
+        return received
+
+    async def _fetch(self, paper, url, path, allow_segments=True):
+        """Stream url into path; return the file size, or None if the response is not a PDF
+
+        Large files from servers that accept ranges continue as a SegmentedDownload
+        after the first chunk has shown that the response is a PDF; anything else
+        is read to the end as a single stream.
+        """
+        part_path = path + ".part"
+        async with self.client.stream("GET", url) as response:
+            if response.status_code != 200:
+                return None
+            total = int(response.headers.get("content-length") or 0)
+            ranges = response.headers.get("accept-ranges", "").lower() == "bytes"
+            segmented = allow_segments and ranges and self.max_segments > 1 and total >= SEGMENT_THRESHOLD
+            final_url = str(response.url)
+
+            chunks = response.aiter_bytes(CHUNK_SIZE)
+            first = await anext(chunks, b"")
+            if not first.lstrip().startswith(b"%PDF"):
+                return None
+            await self.session.bandwidth.consume(len(first))
+            with open(part_path, "wb") as f:
+                f.write(first)
+            received = len(first)
+            self._report_bytes(paper, received, total, force=True)
+            if not segmented:
+                received = await self._stream_rest(paper, final_url, chunks, part_path, received, total)
+
+        if segmented and received < total:
+            try:
+                received = await self._segmented(paper, final_url, part_path, total, offset=received)
+            except RangeNotSupported as e:
+                logger.info(f"Falling back to a single stream for '{paper.title}': {e}")
+                return await self._fetch(paper, url, path, allow_segments=False)
+
+        os.replace(part_path, path)
+        return received
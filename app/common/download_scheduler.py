@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+from loguru import logger
+
+from app.common.download_engine import DownloadEngine, DownloadSession, PER_HOST_CONNECTIONS
+
+# Outcomes passed to on_query_done
+COMPLETED = "completed"
+PAUSED = "paused"
+FAILED = "failed"
+
+
+class DownloadScheduler:
+    """ Run any number of queries at once over one shared DownloadSession
+
+    Every query gets its own DownloadEngine and checkpoint. The engines share
+    the session's max_connections budget in round-robin turns, its per_host
+    limit and its BandwidthLimiter, so one large query cannot starve the
+    others. Queries can be submitted from any thread while run() is going;
+    run() returns once every submitted query has finished, and cancelling it
+    pauses all of them. on_query_done(query, outcome, detail) is called from
+    the event loop with COMPLETED (detail is the paper list), PAUSED or FAILED
+    (detail is the error).
+    """
+
+    def __init__(self, dest, pages, min_year=None, max_connections=8, per_host=PER_HOST_CONNECTIONS,
+                 mirrors=None, on_event=None, on_query_done=None, auto_speed_up=True,
+                 search_cache=None, bandwidth=None):
+        self.dest = dest
+        self.pages = pages
+        self.min_year = min_year
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.mirrors = mirrors
+        self.on_event = on_event
+        self.on_query_done = on_query_done
+        self.auto_speed_up = auto_speed_up
+        self.search_cache = search_cache
+        self.bandwidth = bandwidth
+        # query -> running task
+        self.tasks = {}
+        self._lock = threading.Lock()
+        self._pending = []
+        self._closed = False
+        self._loop = None
+        self._wake = None
+
+    @property
+    def closed(self):
+        """Whether run() has finished or is finishing, so submit() would refuse new queries"""
+        with self._lock:
+            return self._closed
+
+    def submit(self, query):
+        """Queue a query from any thread; returns False if the scheduler has already finished"""
+        with self._lock:
+            if self._closed:
+                return False
+            if query not in self._pending and query not in self.tasks:
+                self._pending.append(query)
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    def _start(self, session, query):
+        engine = DownloadEngine(self.dest, self.max_connections, on_event=self.on_event,
+                                auto_speed_up=self.auto_speed_up, search_cache=self.search_cache)
+        task = asyncio.ensure_future(engine.run(query, self.pages, self.min_year, session))
+        task.add_done_callback(lambda task: self._finished(query, task))
+        self.tasks[query] = task
+
+    def _finished(self, query, task):
+        del self.tasks[query]
+        if task.cancelled():
+            outcome, detail = PAUSED, None
+        elif task.exception() is not None:
+            logger.warning(f"Download run for '{query}' failed: {task.exception()}")
+            outcome, detail = FAILED, str(task.exception())
+        else:
+            outcome, detail = COMPLETED, task.result()
+        if self.on_query_done:
+            self.on_query_done(query, outcome, detail)
+        self._wake.set()
+
+    async def run(self):
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+        try:
+            async with DownloadSession(self.dest, self.max_connections, self.per_host,
+                                       self.mirrors, self.bandwidth) as session:
+                try:
+                    await self._schedule(session)
+                except asyncio.CancelledError:
+                    tasks = list(self.tasks.values())
+                    for task in tasks:
+                        task.cancel()
+                    # Let every engine save its checkpoint before the session closes
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    raise
+        finally:
+            with self._lock:
+                self._closed = True
+
+    async def _schedule(self, session):
+        while True:
+            with self._lock:
+                queries, self._pending = self._pending, []
+                if not queries and not self.tasks:
+                    self._closed = True
+                    return
+            self._wake.clear()
+            for query in queries:
+                self._start(session, query)
+            await self._wake.wait()
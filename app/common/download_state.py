@@ -0,0 +1,60 @@
+import glob
+import hashlib
+import json
+import os
+
+STATE_PREFIX = ".nobleblocks_download"
+
+
+class DownloadCheckpoint:
+    """ Small JSON file in the download folder describing an unfinished run
+
+    It holds the query, the papers still to fetch and, for files that were in
+    flight, the URL, size and byte ranges still missing from their .part file.
+    Each query has its own file so that several runs can be paused at once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def for_query(cls, folder, query):
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+        return cls(os.path.join(folder, f"{STATE_PREFIX}-{digest}.json"))
+
+    @classmethod
+    def saved(cls, folder):
+        """Return (checkpoint, state) for every unfinished run in folder, newest first"""
+        paths = glob.glob(os.path.join(glob.escape(folder), STATE_PREFIX + "*.json"))
+        paths.sort(key=os.path.getmtime, reverse=True)
+        found = []
+        for path in paths:
+            checkpoint = cls(path)
+            state = checkpoint.load()
+            if state and state.get("query"):
+                found.append((checkpoint, state))
+        return found
+
+    @classmethod
+    def find(cls, folder, query):
+        """Return the saved (checkpoint, state) for query, or None"""
+        return next(((checkpoint, state) for checkpoint, state in cls.saved(folder)
+                     if state["query"] == query), None)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, state):
+        # Write a temporary file first so a crash never leaves a truncated checkpoint
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
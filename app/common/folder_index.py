@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from contextlib import closing
+
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+
+from app.common.pdf_scanner import PdfScanThread
+from app.common.sqlite_store import connect
+
+# Quiet time after the last change event before the changed folders are re-listed
+DEBOUNCE_MS = 300
+
+
+class FolderIndex:
+    """ Persistent listing of the PDFs in each folder opened before
+
+    Reopening a folder shows its last known listing at once while a scan in
+    the background brings it up to date.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with closing(connect(db_path)) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS folders (
+                    folder TEXT PRIMARY KEY, recursive INTEGER, scanned REAL);
+                CREATE TABLE IF NOT EXISTS files (
+                    folder TEXT, name TEXT, size INTEGER, mtime REAL,
+                    PRIMARY KEY (folder, name));
+            """)
+
+    def load(self, folder, recursive):
+        """Return the stored (name, size, mtime) list sorted by name, or None if never scanned"""
+        with self._lock, closing(connect(self.db_path)) as conn:
+            row = conn.execute("SELECT recursive FROM folders WHERE folder = ?", (folder,)).fetchone()
+            if row is None or bool(row[0]) != recursive:
+                return None
+            # BINARY collation orders UTF-8 like Python orders str
+            return conn.execute("SELECT name, size, mtime FROM files WHERE folder = ? ORDER BY name",
+                                (folder,)).fetchall()
+
+    def replace(self, folder, recursive, entries):
+        with self._lock, closing(connect(self.db_path)) as conn, conn:
+            conn.execute("DELETE FROM files WHERE folder = ?", (folder,))
+            conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                             ((folder, name, size, mtime) for name, size, mtime in entries))
+            conn.execute("INSERT OR REPLACE INTO folders VALUES (?, ?, ?)",
+                         (folder, int(recursive), time.time()))
+
+    def update(self, folder, added, removed):
+        """Record the files added (name, size, mtime) and removed (name) since the last scan"""
+        with self._lock, closing(connect(self.db_path)) as conn, conn:
+            conn.executemany("DELETE FROM files WHERE folder = ? AND name = ?",
+                             ((folder, name) for name in removed))
+            conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                             ((folder, name, size, mtime) for name, size, mtime in added))
+
+
+class PdfFolderSync(QObject):
+    """ Keeps a PdfListModel in step with a folder on disk
+
+    open() shows the indexed listing right away (or streams a first scan) and
+    reconciles it with a background scan. Afterwards a QFileSystemWatcher
+    reports changed directories; bursts are debounced, only those directories
+    are listed again, and the model and index receive just the difference.
+    """
+    loaded = Signal(int)  # Signal to emit the number of PDFs once a full scan is done
+    error = Signal(str)   # Signal to emit a failure to read the folder
+
+    def __init__(self, model, index, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.index = index
+        self.folder = None
+        self.recursive = False
+        self.scan_thread = None
+        self.refresh_thread = None
+        self.streaming = False
+        # Entries found by the running full scan and by the running refresh
+        self.scanned = []
+        self.refreshed = []
+        self.changed = set()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.onDirectoryChanged)
+        self.debounceTimer = QTimer(self)
+        self.debounceTimer.setSingleShot(True)
+        self.debounceTimer.setInterval(DEBOUNCE_MS)
+        self.debounceTimer.timeout.connect(self.refreshChanged)
+
+    def open(self, folder, recursive=False):
+        """Show folder's PDFs in the model, replacing any folder opened before"""
+        for thread in (self.scan_thread, self.refresh_thread):
+            if thread:
+                thread.cancel()
+        self.scan_thread = self.refresh_thread = None
+        self.changed.clear()
+        self.debounceTimer.stop()
+        self.unwatch()
+        self.folder, self.recursive = folder, recursive
+
+        entries = self.index.load(folder, recursive)
+        self.streaming = entries is None
+        if self.streaming:
+            self.model.startLoading(folder)
+        else:
+            self.model.setFiles(folder, [entry[0] for entry in entries], [entry[1] for entry in entries],
+                                [entry[2] for entry in entries])
+        self.scanned = []
+        self.scan_thread = self.startScan()
+        self.scan_thread.finished.connect(self.onScanFinished)
+
+    def startScan(self, directories=None):
+        thread = PdfScanThread(self.folder, self.recursive, self, directories)
+        thread.found.connect(self.onPdfsFound)
+        thread.error.connect(self.onScanError)
+        thread.start()
+        return thread
+
+    def unwatch(self):
+        watched = self.watcher.directories()
+        if watched:
+            self.watcher.removePaths(watched)
+
+    def watch(self, directories):
+        """Watch those of directories that are not watched yet
+
+        The watcher drops a directory that is removed or renamed, so this is
+        called again after every refresh.
+        """
+        missing = set(directories) - set(self.watcher.directories())
+        missing = sorted(directory for directory in missing if os.path.isdir(directory))
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def onPdfsFound(self, entries):
+        thread = self.sender()
+        if thread is self.scan_thread:
+            self.scanned.extend(entries)
+            if self.streaming:
+                self.model.appendFiles(entries)
+        elif thread is self.refresh_thread:
+            self.refreshed.extend(entries)
+
+    def onScanError(self, message):
+        if self.sender() is self.scan_thread:
+            self.error.emit(message)
+
+    def onScanFinished(self):
+        thread = self.sender()
+        thread.deleteLater()
+        if thread is not self.scan_thread:
+            return
+        self.scan_thread = None
+        if thread.cancelled or thread.failed:
+            return
+        if self.streaming:
+            self.model.sortFiles()
+        else:
+            # The indexed listing was on screen already: apply only what changed since
+            self.applyDiff(self.model.names, self.scanned)
+        self.index.replace(self.folder, self.recursive, self.scanned)
+        self.unwatch()
+        self.watch(thread.visited)
+        self.loaded.emit(len(self.scanned))
+        self.scanned = []
+        if self.changed:
+            self.debounceTimer.start()
+
+    def onDirectoryChanged(self, path):
+        self.changed.add(path)
+        self.debounceTimer.start()
+
+    def refreshChanged(self):
+        """List the directories that changed during the debounce window again"""
+        if self.scan_thread or self.refresh_thread:
+            # Picked up when the running scan finishes
+            self.debounceTimer.start()
+            return
+        directories, self.changed = sorted(self.changed), set()
+        self.refreshed = []
+        # A recursive folder also lists the subfolders created since, whole; the
+        # subfolders watched already are listed on their own when they change
+        self.refresh_thread = PdfScanThread(self.folder, self.recursive, self, directories,
+                                            frozenset(self.watcher.directories()))
+        self.refresh_thread.found.connect(self.onPdfsFound)
+        self.refresh_thread.finished.connect(self.onRefreshFinished)
+        self.refresh_thread.start()
+
+    def onRefreshFinished(self):
+        thread = self.sender()
+        thread.deleteLater()
+        if thread is not self.refresh_thread:
+            return
+        self.refresh_thread = None
+        if thread.cancelled or thread.failed:
+            return
+        directories = set(thread.directories) | set(thread.visited)
+        relative = {os.path.relpath(directory, self.folder) for directory in directories}
+        relative = {"" if directory == os.curdir else directory for directory in relative}
+        listed = [name for directory in relative for name in self.model.namesIn(directory)]
+        added, removed = self.applyDiff(listed, self.refreshed)
+        self.refreshed = []
+        self.index.update(self.folder, added, removed)
+        self.watch(directories)
+        if self.changed:
+            self.debounceTimer.start()
+
+    def applyDiff(self, listed, entries):
+        """Bring the model from names listed to the scanned entries; return (added, removed)
+
+        Added includes files whose size or mtime changed. Every lookup is a
+        bisect, so the cost follows the directories scanned, not the folder.
+        """
+        model = self.model
+        added = []
+        for name, size, mtime in entries:
+            position = model.find(name)
+            if position is None or (model.sizes[position], model.mtimes[position]) != (size, mtime):
+                added.append((name, size, mtime))
+        found = {name for name, _, _ in entries}
+        removed = [name for name in listed if name not in found]
+        for name in removed:
+            self.model.removeFile(name)
+        for name, size, mtime in added:
+            self.model.insertFile(name, size, mtime)
+        return added, removed
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+from app.common.sqlite_store import connect
+
+QUEUED = "queued"
+EXTRACTING = "extracting"
+ANALYSING = "analysing"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+INCOMPLETE = (QUEUED, EXTRACTING, ANALYSING)
+
+JOB_FIELDS = ("state", "digest", "started_at", "finished_at", "extract_time",
+              "analyse_time", "result", "error")
+
+
+class JobQueue:
+    """ Durable queue of paper check jobs in a SQLite database (WAL mode)
+
+    Every state change is written immediately, so after a crash or restart the
+    unfinished jobs can be picked up again in their original order.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = connect(db_path)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL,
+                    digest TEXT,
+                    state TEXT NOT NULL,
+                    queued_at REAL,
+                    started_at REAL,
+                    finished_at REAL,
+                    extract_time REAL,
+                    analyse_time REAL,
+                    result TEXT,
+                    error TEXT);
+                CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+                CREATE INDEX IF NOT EXISTS jobs_digest ON jobs (digest, state);
+                CREATE INDEX IF NOT EXISTS jobs_path ON jobs (path, id);
+            """)
+            # Jobs that were running when the app went away start over from the queue
+            self._conn.execute("UPDATE jobs SET state = ? WHERE state IN (?, ?)",
+                               (QUEUED, EXTRACTING, ANALYSING))
+
+    def enqueue(self, paths):
+        """Add jobs for paths, reusing jobs that are still incomplete; return their ids in order"""
+        ids = []
+        with self._lock, self._conn:
+            for path in paths:
+                path = os.path.abspath(path)
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE path = ? AND state IN (?, ?, ?) ORDER BY id LIMIT 1",
+                    (path, *INCOMPLETE)).fetchone()
+                if row:
+                    ids.append(row[0])
+                else:
+                    cursor = self._conn.execute(
+                        "INSERT INTO jobs (path, state, queued_at) VALUES (?, ?, ?)",
+                        (path, QUEUED, time.time()))
+                    ids.append(cursor.lastrowid)
+        return ids
+
+    def pending(self):
+        """Return [(job_id, path)] of incomplete jobs, oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, path FROM jobs WHERE state IN (?, ?, ?) ORDER BY id",
+                INCOMPLETE).fetchall()
+
+    def update(self, job_id, **fields):
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def cancel_pending(self, job_ids):
+        """Mark the jobs among job_ids that have not started yet as cancelled"""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE jobs SET state = ?, finished_at = ? WHERE id = ? AND state = ?",
+                                   ((CANCELLED, time.time(), job_id, QUEUED) for job_id in job_ids))
+
+    def result_for_digest(self, digest):
+        """Return the result of the latest finished job for this file content, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM jobs WHERE digest = ? AND state = ? ORDER BY id DESC LIMIT 1",
+                (digest, DONE)).fetchone()
+        return row[0] if row else None
+
+    def latest(self, path):
+        """Return the latest job for path as a dict, or None"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT * FROM jobs WHERE path = ? ORDER BY id DESC LIMIT 1", (os.path.abspath(path),))
+            row = cursor.fetchone()
+            return dict(zip([c[0] for c in cursor.description], row)) if row else None
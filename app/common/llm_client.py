@@ -0,0 +1,232 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from loguru import logger
+
+API_BASE = "https://api.openai.com/v1"
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """Parse rate-limit reset values such as '20ms', '1.5s' or '6m0s' into seconds"""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(n) * DURATION_UNITS[unit] for n, unit in DURATION_RE.findall(value))
+
+
+class TokenBucket:
+    """ Token bucket refilled continuously, resynchronised from rate-limit response headers """
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, cost=1):
+        cost = min(cost, self.capacity)
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.blocked_until and self.tokens >= cost:
+                self.tokens -= cost
+                return
+            wait = max(self.blocked_until - now, (cost - self.tokens) / self.rate)
+            await asyncio.sleep(wait)
+
+    def update(self, limit, remaining, reset):
+        """Apply x-ratelimit-limit-*, x-ratelimit-remaining-* and x-ratelimit-reset-* values"""
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = limit
+            self.rate = limit / 60.0
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0:
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+
+def _header_int(headers, name):
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AsyncAnalysisService:
+    """ Async chat-completions client for paper analysis
+
+    Requests share one pooled httpx connection set, at most max_in_flight run at
+    once (adjustable with set_max_in_flight()), request and token buckets follow
+    the provider's rate-limit headers, and 429/5xx responses are retried with
+    jittered exponential backoff. The service owns an event loop on a background
+    thread, so blocking callers can use complete() while async callers submit
+    coroutines with run().
+    """
+
+    def __init__(self, api_key, base_url=API_BASE, max_in_flight=8, max_retries=6,
+                 timeout=600.0, requests_per_minute=500, tokens_per_minute=200000):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="AnalysisService", daemon=True)
+        self._thread.start()
+        self._client = self.run(self._create_client()).result()
+
+    async def _create_client(self):
+        self._running = 0
+        self._slots = asyncio.Condition()
+        # The pool itself is unbounded: the in-flight limit already caps the connections in use
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            limits=httpx.Limits(max_connections=None,
+                                max_keepalive_connections=self.max_in_flight),
+            timeout=httpx.Timeout(self.timeout, connect=15.0),
+        )
+
+    def set_max_in_flight(self, max_in_flight):
+        """Change the concurrent request limit from any thread; running requests are kept"""
+        self.run(self._resize(max_in_flight))
+
+    async def _resize(self, max_in_flight):
+        async with self._slots:
+            self.max_in_flight = max_in_flight
+            self._slots.notify_all()
+
+    @asynccontextmanager
+    async def _slot(self):
+        async with self._slots:
+            await self._slots.wait_for(lambda: self._running < self.max_in_flight)
+            self._running += 1
+        try:
+            yield
+        finally:
+            async with self._slots:
+                self._running -= 1
+                self._slots.notify_all()
+
+    def run(self, coro):
+        """Schedule a coroutine on the service loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def complete(self, model, content, on_delta=None):
+        """Blocking completion; safe to call from any thread except the service loop"""
+        return self.run(self.acomplete(model, content, on_delta)).result()
+
+    async def acomplete(self, model, content, on_delta=None):
+        """Run one chat completion, streaming deltas to on_delta if given"""
+        payload = {"model": model, "messages": [{"role": "user", "content": content}]}
+        streamed = []
+        if on_delta is not None:
+            payload["stream"] = True
+
+            def forward(delta):
+                streamed.append(delta)
+                on_delta(delta)
+        # Rough prompt size for the token bucket, about 4 characters per token
+        cost = len(content) // 4 + 1
+
+        async with self._slot():
+            for attempt in range(self.max_retries + 1):
+                await self.requests.acquire()
+                await self.tokens.acquire(cost)
+                try:
+                    if on_delta is None:
+                        response = await self._client.post("/chat/completions", json=payload)
+                        self._update_limits(response.headers)
+                        if response.status_code not in RETRY_STATUS:
+                            response.raise_for_status()
+                            return response.json()["choices"][0]["message"]["content"]
+                    else:
+                        async with self._client.stream("POST", "/chat/completions", json=payload) as response:
+                            self._update_limits(response.headers)
+                            if response.status_code not in RETRY_STATUS:
+                                if response.is_error:
+                                    await response.aread()
+                                    response.raise_for_status()
+                                return await self._read_stream(response, forward)
+                    retry_after = response.headers.get("retry-after")
+                    error = f"HTTP {response.status_code}"
+                except httpx.TransportError as e:
+                    # Deltas already shown cannot be taken back, so a broken stream is not retried
+                    if streamed:
+                        raise
+                    retry_after = None
+                    error = repr(e)
+
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"Analysis request failed after {attempt + 1} attempts: {error}")
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(f"Analysis request failed ({error}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _read_stream(self, response, on_delta):
+        parts = []
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+        return "".join(parts)
+
+    def _update_limits(self, headers):
+        self.requests.update(_header_int(headers, "x-ratelimit-limit-requests"),
+                             _header_int(headers, "x-ratelimit-remaining-requests"),
+                             parse_duration(headers.get("x-ratelimit-reset-requests")))
+        self.tokens.update(_header_int(headers, "x-ratelimit-limit-tokens"),
+                           _header_int(headers, "x-ratelimit-remaining-tokens"),
+                           parse_duration(headers.get("x-ratelimit-reset-tokens")))
+
+    @staticmethod
+    def _backoff(attempt, retry_after=None, base=1.0, cap=60.0):
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(cap, base * 2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    async def _shutdown(self):
+        # Let requests that are already running finish before dropping the connections
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.gather(*pending, return_exceptions=True)
+        await self._client.aclose()
+
+    def close(self):
+        """Wait for in-flight requests, then close the connections and stop the loop"""
+        self.run(self._shutdown()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
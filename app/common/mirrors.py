@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import httpx
+from loguru import logger
+
+DEFAULT_MIRRORS = ["https://sci-hub.se", "https://sci-hub.st", "https://sci-hub.ru", "https://sci-hub.do"]
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Weight of the newest sample in the latency and success-rate moving averages
+EWMA_ALPHA = 0.3
+
+
+class MirrorUnavailable(Exception):
+    """ Every mirror failed or has its circuit breaker open """
+
+
+class CircuitBreaker:
+    """ Stops routing to an endpoint after repeated failures, retrying it after a cool-down
+
+    After failure_threshold consecutive failures the breaker opens. Once
+    reset_timeout has passed it lets trial requests through (half-open) until
+    one of them reports back: success closes it again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+
+class MirrorHealth:
+    """ Moving averages of latency and success rate for one mirror """
+
+    def __init__(self, url, breaker):
+        self.url = url
+        self.breaker = breaker
+        self.latency = None
+        self.success_rate = 1.0
+
+    def record(self, ok, latency=None):
+        self.success_rate += EWMA_ALPHA * ((1.0 if ok else 0.0) - self.success_rate)
+        if ok and latency is not None:
+            self.latency = latency if self.latency is None else \
+                self.latency + EWMA_ALPHA * (latency - self.latency)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    @property
+    def score(self):
+        """Expected cost of a request; lower is better. Unmeasured mirrors sort last among healthy ones"""
+        latency = self.latency if self.latency is not None else 10.0
+        return latency / max(self.success_rate, 0.05)
+
+
+class MirrorManager:
+    """ Route requests to the fastest healthy mirror, with failover and background probing
+
+    run_probes() measures every mirror each probe_interval seconds. call() tries
+    mirrors from best to worst score, skipping those whose breaker is open, and
+    feeds each outcome back into that mirror's health.
+    """
+
+    def __init__(self, mirrors=None, probe_interval=60.0, probe_timeout=10.0,
+                 failure_threshold=3, reset_timeout=60.0, clock=time.monotonic):
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.clock = clock
+        self.mirrors = [MirrorHealth(url.rstrip("/"), CircuitBreaker(failure_threshold, reset_timeout, clock))
+                        for url in (mirrors or DEFAULT_MIRRORS)]
+
+    def ordered(self):
+        """Mirrors that may receive a request now, best first"""
+        return sorted((m for m in self.mirrors if m.breaker.allow()), key=lambda m: m.score)
+
+    def best(self):
+        candidates = self.ordered()
+        return candidates[0].url if candidates else None
+
+    def _health(self, url):
+        return next(m for m in self.mirrors if m.url == url)
+
+    def record(self, url, ok, latency=None):
+        self._health(url).record(ok, latency)
+
+    async def call(self, request):
+        """Await request(mirror_url) on the best mirror, failing over to the next on errors"""
+        errors = []
+        for mirror in self.ordered():
+            start = self.clock()
+            try:
+                result = await request(mirror.url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                mirror.record(False)
+                errors.append(f"{mirror.url}: {e}")
+                logger.info(f"Mirror {mirror.url} failed ({e}), trying the next one")
+                continue
+            mirror.record(True, self.clock() - start)
+            return result
+        raise MirrorUnavailable("; ".join(errors) or "All mirrors are unavailable")
+
+    async def probe(self, client, mirror):
+        start = self.clock()
+        try:
+            response = await client.head(mirror.url, timeout=self.probe_timeout)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        mirror.record(ok, self.clock() - start if ok else None)
+
+    async def probe_all(self, client):
+        # Mirrors with an open breaker are probed too, so a recovered mirror closes it again
+        await asyncio.gather(*(self.probe(client, mirror) for mirror in self.mirrors))
+
+    async def run_probes(self, client):
+        """Probe every mirror now and then every probe_interval seconds until cancelled"""
+        while True:
+            await self.probe_all(client)
+            await asyncio.sleep(self.probe_interval)
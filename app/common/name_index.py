@@ -0,0 +1,147 @@
+from array import array
+from bisect import bisect_left
+
+# Everything but letters and digits separates the words of a filename (newlines separate names)
+_SEPARATORS = {code: " " for code in range(128) if not chr(code).isalnum() and code != ord("\n")}
+
+# Tokens shorter than this only match the start of a word
+SUBSTRING_MIN = 3
+# Tokens this long that match no word exactly accept words one edit away, two from FUZZY_LONG on
+FUZZY_MIN = 4
+FUZZY_LONG = 8
+
+
+def name_words(name):
+    """Lowercased words of a filename"""
+    return name.lower().translate(_SEPARATORS).split()
+
+
+def within_distance(a, b, limit):
+    """Whether the edit distance between a and b is at most limit"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+def word_matches(token, word, fuzzy):
+    if word.startswith(token) or (len(token) >= SUBSTRING_MIN and token in word):
+        return True
+    return fuzzy and within_distance(token, word, 2 if len(token) >= FUZZY_LONG else 1)
+
+
+class NameIndex:
+    """ Inverted index from filename words to the names containing them
+
+    A query is split into tokens like the names are, and a name matches when
+    every token matches one of its words: short tokens as a word prefix,
+    longer ones anywhere inside a word, and a token no word contains
+    accepts words within a small edit distance instead. Queries only scan
+    the vocabulary, which is far smaller than the list of names; a trigram
+    index over the vocabulary narrows fuzzy lookups further.
+    """
+
+    def __init__(self, names=()):
+        # Key -> name, None once removed; keys are never reused
+        self.names = []
+        self.keys = {}
+        # word -> keys of the names containing it
+        self.postings = {}
+        # trigram -> words containing it
+        self.trigrams = {}
+        self._vocabulary = None
+        self.extend(names)
+
+    def extend(self, names):
+        """Add many names at once, lowercasing and splitting them in one pass"""
+        if not names:
+            return
+        lines = "\n".join(names).lower().translate(_SEPARATORS).split("\n")
+        keys = self.keys
+        for name, line in zip(names, lines):
+            if name not in keys:
+                self._add(name, line.split())
+
+    def _add(self, name, words):
+        key = len(self.names)
+        self.names.append(name)
+        self.keys[name] = key
+        postings = self.postings
+        for word in set(words):
+            keys = postings.get(word)
+            if keys is None:
+                postings[word] = keys = array("l")
+                self._vocabulary = None
+                for trigram in {word[i:i + 3] for i in range(len(word) - 2)}:
+                    self.trigrams.setdefault(trigram, []).append(word)
+            keys.append(key)
+
+    def add(self, name):
+        if name not in self.keys:
+            self._add(name, name_words(name))
+
+    def remove(self, name):
+        key = self.keys.pop(name, None)
+        if key is not None:
+            # The key stays in its postings and is skipped by search()
+            self.names[key] = None
+
+    def vocabulary(self):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def query(self, text):
+        """Compile text into [(token, fuzzy)], fuzzy set for tokens no word contains"""
+        vocabulary = self.vocabulary()
+        tokens = []
+        for token in dict.fromkeys(name_words(text)):
+            start = bisect_left(vocabulary, token)
+            exact = start < len(vocabulary) and vocabulary[start].startswith(token)
+            if not exact and len(token) >= SUBSTRING_MIN:
+                exact = any(token in word for word in vocabulary)
+            tokens.append((token, not exact and len(token) >= FUZZY_MIN))
+        return tokens
+
+    def _words(self, token, fuzzy):
+        vocabulary = self.vocabulary()
+        if fuzzy:
+            return [word for word in self._similar(token) if word_matches(token, word, True)]
+        start = bisect_left(vocabulary, token)
+        end = bisect_left(vocabulary, token + "\uffff", start)
+        words = vocabulary[start:end]
+        if len(token) >= SUBSTRING_MIN:
+            words += [word for word in vocabulary if token in word and not word.startswith(token)]
+        return words
+
+    def _similar(self, token):
+        """Words sharing a trigram with token, the candidates for a fuzzy match"""
+        similar = set()
+        for i in range(len(token) - 2):
+            similar.update(self.trigrams.get(token[i:i + 3], ()))
+        return similar
+
+    def search(self, query):
+        """Names matching a compiled query"""
+        matched = None
+        for token, fuzzy in query:
+            keys = set()
+            for word in self._words(token, fuzzy):
+                keys.update(self.postings[word])
+            matched = keys if matched is None else matched & keys
+            if not matched:
+                return set()
+        names = self.names
+        return {names[key] for key in matched} - {None} if matched else set()
+
+    def matches(self, query, name):
+        """Whether one name matches a compiled query, indexed or not"""
+        words = name_words(name)
+        return all(any(word_matches(token, word, fuzzy) for word in words) for token, fuzzy in query)
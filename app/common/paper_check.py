@@ -1,42 +1,314 @@
-from openai import OpenAI
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from loguru import logger
 from spire.pdf import PdfDocument
 from spire.pdf import PdfTextExtractOptions
 from spire.pdf import PdfTextExtractor
-from app.common.secrets import secrets
+from app.common.chunking import chunk_pages
+from app.common.llm_client import AsyncAnalysisService
+from app.common.response_cache import response_key
 import os
+import threading
 
-client = OpenAI(api_key=secrets.apiKey)
-pdf = PdfDocument()
-
-def analyze_paper(text):
-    response = client.chat.completions.create(
-        model="o1-preview",
-        messages=[
-            {
-                "role": "user",
-                "content": f"I have a scientific paper that I would like to analyze these papers and identify any errors and give me the solution for each error. These errors could be in calculations, logic, methodology, data interpretation, or even formatting. This is the full paper: " + text
-            }
-        ]
-    )
-    return response.choices[0].message.content
-
-def extract_text_from_pdf(file_path):
-    extract_options = PdfTextExtractOptions()
-    extracted_text = ""
-    if os.path.exists(file_path):
-        pdf.LoadFromFile(file_path)
-        for i in range(pdf.Pages.Count):
-            page = pdf.Pages.get_Item(i)
-            text_extractor = PdfTextExtractor(page)
-            text = text_extractor.ExtractText(extract_options)
-            extracted_text += text
-        cleaned_text = extracted_text.replace("Evaluation Warning : The document was created with Spire.PDF for Python.", "")
+MODEL = "o1-preview"
+
+# Bump PROMPT_VERSION whenever one of the prompts changes so cached responses are not reused
+PROMPT_VERSION = 1
+PROMPT = "I have a scientific paper that I would like to analyze these papers and identify any errors and give me the solution for each error. These errors could be in calculations, logic, methodology, data interpretation, or even formatting. This is the full paper: "
+
+CHUNK_PROMPT = "I have a long scientific paper that is split into {total} parts. Analyze this part (pages {pages}) and identify any errors and give me the solution for each error. These errors could be in calculations, logic, methodology, data interpretation, or even formatting. Only report errors you can see in this part. This is the part: "
+REDUCE_PROMPT = "The following are error reports for consecutive parts of one scientific paper. Merge them into a single report: remove duplicates, keep the page references, and give the solution for each error. These are the reports: "
+
+# Papers estimated above this many tokens are analyzed in chunks that run concurrently
+CHUNK_TOKEN_BUDGET = 24000
+
+EVALUATION_WARNING = "Evaluation Warning : The document was created with Spire.PDF for Python."
+
+# Pages handed to one worker task; small enough to balance, large enough to amortize IPC
+PAGES_PER_TASK = 8
+
+_service = None
+_service_lock = threading.Lock()
+
+_extract_pool = None
+_extract_pool_workers = 0
+# Pool -> number of extractions using it; a replaced pool shuts down when it drops to zero
+_extract_pool_users = {}
+_extract_pool_lock = threading.Lock()
+
+# Document handle owned by the current worker process, reused across tasks for the same file
+_worker_doc = None
+_worker_doc_key = None
+
+
+def configure_service(api_key=None, **options):
+    """Replace the shared analysis service, e.g. to change max_in_flight"""
+    global _service
+    if api_key is None:
+        from app.common.secrets import secrets
+        api_key = secrets.apiKey
+    with _service_lock:
+        old, _service = _service, AsyncAnalysisService(api_key, **options)
+    if old is not None:
+        threading.Thread(target=old.close, daemon=True).start()
+    return _service
+
+
+def set_max_in_flight(max_in_flight):
+    """Change the shared service's concurrent request limit without replacing it"""
+    with _service_lock:
+        service = _service
+    if service is None:
+        configure_service(max_in_flight=max_in_flight)
     else:
+        service.set_max_in_flight(max_in_flight)
+
+
+def get_service():
+    """Return the shared analysis service, creating it with default options on first use"""
+    with _service_lock:
+        service = _service
+    return service or configure_service()
+
+
+def _complete(content, on_delta=None):
+    """Run one completion, streaming text deltas to on_delta as they arrive if given"""
+    return get_service().complete(MODEL, content, on_delta)
+
+
+def _cached_complete(content, key, cache, on_delta=None):
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"Response cache hit: {cache.stats()}")
+            if on_delta:
+                on_delta(cached)
+            return cached
+    result = _complete(content, on_delta)
+    if cache is not None:
+        cache.put(key, MODEL, result)
+    return result
+
+
+def analyze_paper(text, cache=None, on_delta=None):
+    key = response_key(text, MODEL, PROMPT_VERSION)
+    return _cached_complete(PROMPT + text, key, cache, on_delta)
+
+
+def analyze_chunks(chunks, cache=None):
+    """Analyze every chunk concurrently on the service loop, bounded by its max_in_flight"""
+    service = get_service()
+    total = len(chunks)
+    contents = [CHUNK_PROMPT.format(pages=f"{chunk.first_page + 1}-{chunk.last_page + 1}", total=total)
+                + chunk.text for chunk in chunks]
+    # The key covers the whole prompt, page range included: the same text at other pages is another request
+    keys = [response_key(content, MODEL, f"{PROMPT_VERSION}-chunk") for content in contents]
+    results = [cache.get(key) if cache is not None else None for key in keys]
+
+    futures = {}
+    for i, content in enumerate(contents):
+        if results[i] is None:
+            futures[i] = service.run(service.acomplete(MODEL, content))
+    try:
+        for i, future in futures.items():
+            results[i] = future.result()
+            if cache is not None:
+                cache.put(keys[i], MODEL, results[i])
+    finally:
+        for future in futures.values():
+            future.cancel()
+    return results
+
+
+def reduce_findings(findings, cache=None, on_delta=None):
+    parts = [f"## Findings for pages {chunk.first_page + 1}-{chunk.last_page + 1}\n{result}"
+             for chunk, result in findings]
+    text = "\n\n".join(parts)
+    key = response_key(text, MODEL, f"{PROMPT_VERSION}-reduce")
+    return _cached_complete(REDUCE_PROMPT + text, key, cache, on_delta)
+
+
+def analyze_pages(pages, cache=None, on_delta=None, token_budget=CHUNK_TOKEN_BUDGET):
+    """Analyze a paper given as (page_index, text) pairs, map-reducing over chunks when it is long
+
+    Only the final report is streamed to on_delta: the whole paper when it fits in one
+    request, otherwise the reduce step.
+    """
+    pages = list(pages)
+    text = join_pages(pages)
+    chunks = chunk_pages(pages, token_budget)
+    if len(chunks) <= 1:
+        return analyze_paper(text, cache, on_delta)
+
+    # A paper analyzed before returns its merged report without redoing the map step
+    key = response_key(text, MODEL, f"{PROMPT_VERSION}-mapreduce")
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            if on_delta:
+                on_delta(cached)
+            return cached
+
+    results = analyze_chunks(chunks, cache)
+    result = reduce_findings(list(zip(chunks, results)), cache, on_delta)
+    if cache is not None:
+        cache.put(key, MODEL, result)
+    return result
+
+
+def _extract_page(doc, index, options):
+    text = PdfTextExtractor(doc.Pages.get_Item(index)).ExtractText(options)
+    return text.replace(EVALUATION_WARNING, "")
+
+
+def _worker_document(file_path):
+    """Return this process' own document handle for file_path, loading it on first use"""
+    global _worker_doc, _worker_doc_key
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_size, stat.st_mtime_ns)
+    if _worker_doc_key != key:
+        if _worker_doc is not None:
+            _worker_doc.Close()
+        _worker_doc = PdfDocument()
+        _worker_doc.LoadFromFile(file_path)
+        _worker_doc_key = key
+    return _worker_doc
+
+
+def _extract_page_range(file_path, start, stop):
+    """Worker task: extract pages [start, stop) of file_path, or fewer if it ends earlier"""
+    doc = _worker_document(file_path)
+    options = PdfTextExtractOptions()
+    return [(i, _extract_page(doc, i, options)) for i in range(start, min(stop, doc.Pages.Count))]
+
+
+def _extract_first_range(file_path, stop):
+    """Worker task: the page count of file_path and the text of its pages [0, stop)"""
+    count = _worker_document(file_path).Pages.Count
+    return count, _extract_page_range(file_path, 0, min(stop, count))
+
+
+@contextmanager
+def extract_pool(workers):
+    """Borrow the shared extraction process pool, resized to workers
+
+    A resize starts a new pool for later extractions; the old one keeps
+    serving the extractions already using it and shuts down after the last.
+    """
+    global _extract_pool, _extract_pool_workers
+    with _extract_pool_lock:
+        if _extract_pool is None or _extract_pool_workers != workers:
+            retired = _extract_pool
+            _extract_pool = ProcessPoolExecutor(max_workers=workers)
+            _extract_pool_workers = workers
+            if retired is not None and retired not in _extract_pool_users:
+                retired.shutdown(wait=False)
+        pool = _extract_pool
+        _extract_pool_users[pool] = _extract_pool_users.get(pool, 0) + 1
+    try:
+        yield pool
+    finally:
+        with _extract_pool_lock:
+            _extract_pool_users[pool] -= 1
+            if not _extract_pool_users[pool]:
+                del _extract_pool_users[pool]
+                if pool is not _extract_pool:
+                    pool.shutdown(wait=False)
+
+
+def shutdown_extract_pool():
+    """Shut every extraction pool down, cancelling the work still queued; for quitting"""
+    global _extract_pool, _extract_pool_workers
+    with _extract_pool_lock:
+        for pool in {_extract_pool, *_extract_pool_users} - {None}:
+            pool.shutdown(wait=False, cancel_futures=True)
+        _extract_pool = None
+        _extract_pool_workers = 0
+
+
+def iter_pdf_pages(file_path):
+    """Yield (page_index, text) for each page as soon as it is extracted"""
+    if not os.path.exists(file_path):
+        print(f"File not found: {file_path}")
+        return
+    extract_options = PdfTextExtractOptions()
+    doc = PdfDocument()
+    doc.LoadFromFile(file_path)
+    try:
+        for i in range(doc.Pages.Count):
+            yield i, _extract_page(doc, i, extract_options)
+    finally:
+        doc.Close()
+
+
+def iter_pdf_pages_parallel(file_path, workers):
+    """Yield (page_index, text) in page order, with page ranges extracted across a process pool"""
+    if not os.path.exists(file_path):
         print(f"File not found: {file_path}")
-        return ""
-    return cleaned_text
+        return
+    with extract_pool(workers) as pool:
+        # The page count is only known once a worker has parsed the file, so the first wave of
+        # ranges goes out before it: every worker starts parsing at once and ranges past the end
+        # come back empty. The parent never parses the file itself.
+        step = PAGES_PER_TASK
+        first = pool.submit(_extract_first_range, file_path, step)
+        futures = [pool.submit(_extract_page_range, file_path, start, start + step)
+                   for start in range(step, workers * step, step)]
+        try:
+            count, pages = first.result()
+            yield from pages
+            futures += [pool.submit(_extract_page_range, file_path, start, min(start + step, count))
+                        for start in range(workers * step, count, step)]
+            # Futures are in page order, so waiting on them in turn merges the results in order
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in [first] + futures:
+                future.cancel()
+
+
+def iter_pages(file_path, workers=1, cache=None):
+    """Yield (page_index, text), served from cache when the file content was seen before"""
+    if workers > 1:
+        pages = iter_pdf_pages_parallel(file_path, workers)
+    else:
+        pages = iter_pdf_pages(file_path)
+    if cache is None or not os.path.exists(file_path):
+        yield from pages
+        return
+
+    digest = cache.digest(file_path)
+    cached = cache.get(digest)
+    if cached is not None:
+        yield from cached
+        return
+
+    extracted = []
+    for page in pages:
+        extracted.append(page)
+        yield page
+    cache.put(digest, extracted)
+
+
+def join_pages(pages, progress=None):
+    """Join (page_index, text) pairs into one string without repeated concatenation"""
+    parts = []
+    for i, text in pages:
+        parts.append(text)
+        if progress:
+            progress(i)
+    return "".join(parts)
+
+
+def extract_text_from_pdf(file_path, progress=None, workers=1, cache=None):
+    return join_pages(iter_pages(file_path, workers, cache), progress)
+
 
-def check_paper(file_path):
-    text = extract_text_from_pdf(file_path)
-    results = analyze_paper(text)
+def check_paper(file_path, progress=None, workers=1, cache=None, response_cache=None, on_delta=None):
+    pages = []
+    for i, text in iter_pages(file_path, workers, cache):
+        pages.append((i, text))
+        if progress:
+            progress(i)
+    results = analyze_pages(pages, response_cache, on_delta)
     return results
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+from app.common.paper_search import normalize_title
+from app.common.sqlite_store import connect
+from app.common.text_cache import file_digest
+
+INDEX_FILE = ".nobleblocks_papers.db"
+
+
+class PaperIndex:
+    """ Index of the PDFs in a download folder by DOI, normalized title and content hash
+
+    The download engine asks it before fetching a paper and records every file
+    that arrives, so overlapping queries do not fetch the same paper twice.
+    sync() brings it up to date with files added or removed by other means,
+    hashing only files whose size or mtime changed.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._conn = connect(os.path.join(folder, INDEX_FILE))
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS papers (
+                    filename TEXT PRIMARY KEY,
+                    doi TEXT,
+                    title_key TEXT,
+                    sha256 TEXT,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    added REAL);
+                CREATE INDEX IF NOT EXISTS papers_doi ON papers (doi);
+                CREATE INDEX IF NOT EXISTS papers_title ON papers (title_key);
+                CREATE INDEX IF NOT EXISTS papers_sha256 ON papers (sha256);
+            """)
+
+    def sync(self):
+        """Add new or changed PDFs in the folder and drop entries whose file is gone"""
+        with self._lock:
+            known = {row[0]: (row[1], row[2]) for row in
+                     self._conn.execute("SELECT filename, size, mtime_ns FROM papers")}
+        seen = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(".pdf"):
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                if known.get(entry.name) != (stat.st_size, stat.st_mtime_ns):
+                    title = os.path.splitext(entry.name)[0]
+                    self._record(entry.name, None, title, file_digest(entry.path), stat)
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM papers WHERE filename = ?",
+                                   [(name,) for name in set(known) - seen])
+
+    def _record(self, filename, doi, title, sha256, stat):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO papers VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (filename) DO UPDATE SET "
+                "doi = COALESCE(excluded.doi, doi), title_key = excluded.title_key, "
+                "sha256 = excluded.sha256, size = excluded.size, mtime_ns = excluded.mtime_ns",
+                (filename, doi.lower() if doi else None, normalize_title(title), sha256,
+                 stat.st_size, stat.st_mtime_ns, time.time()))
+
+    def find(self, paper):
+        """Return the filename of an already downloaded copy of paper, or None"""
+        with self._lock:
+            row = None
+            if paper.doi:
+                row = self._conn.execute("SELECT filename FROM papers WHERE doi = ?",
+                                         (paper.doi.lower(),)).fetchone()
+            if row is None:
+                row = self._conn.execute("SELECT filename FROM papers WHERE title_key = ?",
+                                         (normalize_title(paper.title),)).fetchone()
+        if row and os.path.exists(os.path.join(self.folder, row[0])):
+            return row[0]
+        return None
+
+    def add(self, paper, path):
+        """Record a downloaded file; return the filename of an identical file already indexed, if any"""
+        sha256 = file_digest(path)
+        filename = os.path.basename(path)
+        with self._lock:
+            row = self._conn.execute("SELECT filename FROM papers WHERE sha256 = ? AND filename != ?",
+                                     (sha256, filename)).fetchone()
+        if row and os.path.exists(os.path.join(self.folder, row[0])):
+            return row[0]
+        self._record(filename, paper.doi, paper.title, sha256, os.stat(path))
+        return None
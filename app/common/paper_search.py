@@ -0,0 +1,169 @@
+import asyncio
+import re
+from html import unescape
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+SCHOLAR_URL = "https://scholar.google.com/scholar"
+CROSSREF_URL = "https://api.crossref.org/works"
+RESULTS_PER_PAGE = 10
+
+DOI_RE = re.compile(r"\b(10\.\d{4,9}/[^\s\"'<>&?#]+)", re.IGNORECASE)
+YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+PDF_SRC_RE = re.compile(r"<(?:embed|iframe)[^>]+src\s*=\s*[\"']([^\"']+)[\"']", re.IGNORECASE)
+CITATION_PDF_RE = re.compile(r"<meta[^>]+name=[\"']citation_pdf_url[\"'][^>]+content=[\"']([^\"']+)", re.IGNORECASE)
+UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|\r\n\t]+')
+
+
+class PaperRecord:
+    """ One search result and what is known about where to download it """
+
+    def __init__(self, title, url=None, pdf_url=None, doi=None, year=None):
+        self.title = title
+        self.url = url
+        self.pdf_url = pdf_url
+        self.doi = doi or (extract_doi(url) if url else None)
+        self.year = year
+
+    @property
+    def filename(self):
+        name = UNSAFE_NAME_RE.sub(" ", self.title).strip(" .")
+        return (name[:150] or "paper") + ".pdf"
+
+    def to_dict(self):
+        return {"title": self.title, "url": self.url, "pdf_url": self.pdf_url,
+                "doi": self.doi, "year": self.year}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["title"], data.get("url"), data.get("pdf_url"), data.get("doi"), data.get("year"))
+
+
+def extract_doi(text):
+    match = DOI_RE.search(text or "")
+    return match.group(1).rstrip(".,;)") if match else None
+
+
+def normalize_title(title):
+    return re.sub(r"[^a-z0-9]+", " ", title.lower()).strip()
+
+
+class ScholarPageParser(HTMLParser):
+    """ Collect PaperRecords from one Google Scholar result page """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self._stack = []
+        self._current = None
+        self._title = None
+        self._byline = None
+
+    def _inside(self, cls):
+        return any(cls in classes for _, classes in self._stack)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "div" and "gs_r" in classes and "gs_or" in classes:
+            self._current = {"title": [], "url": None, "pdf_url": None, "byline": []}
+            self.records.append(self._current)
+        if self._current is not None and tag == "a":
+            if self._inside("gs_or_ggsm") and not self._current["pdf_url"]:
+                self._current["pdf_url"] = attrs.get("href")
+            elif self._inside("gs_rt") and not self._current["url"]:
+                self._current["url"] = attrs.get("href")
+        if tag not in ("br", "img", "input", "meta", "link"):
+            self._stack.append((tag, classes))
+
+    def handle_endtag(self, tag):
+        while self._stack:
+            if self._stack.pop()[0] == tag:
+                break
+
+    def handle_data(self, data):
+        if self._current is None:
+            return
+        if self._inside("gs_rt"):
+            self._current["title"].append(data)
+        elif self._inside("gs_a"):
+            self._current["byline"].append(data)
+
+
+def parse_scholar_page(html):
+    parser = ScholarPageParser()
+    parser.feed(html)
+    papers = []
+    for record in parser.records:
+        # Drop the "[PDF]" / "[HTML]" / "[CITATION]" markers in front of the title
+        title = re.sub(r"^\s*(\[[A-Z]+\]\s*)+", "", unescape("".join(record["title"]))).strip()
+        if not title:
+            continue
+        year = YEAR_RE.findall("".join(record["byline"]))
+        papers.append(PaperRecord(title, record["url"], record["pdf_url"],
+                                  year=int(year[-1]) if year else None))
+    return papers
+
+
+async def fetch_scholar_page(client, query, page, min_year=None):
+    params = {"q": query, "start": page * RESULTS_PER_PAGE, "hl": "en"}
+    if min_year:
+        params["as_ylo"] = min_year
+    response = await client.get(SCHOLAR_URL, params=params)
+    response.raise_for_status()
+    return parse_scholar_page(response.text)
+
+
+async def search_scholar(client, query, pages, min_year=None, cache=None):
+    """Fetch result pages concurrently and return their papers in result order
+
+    With a SearchCache, pages fetched recently are reused and only the missing
+    ones go to the network. Pages without results are not cached: Scholar
+    serves its block page with status 200, and it would hide the query.
+    """
+    async def fetch_page(page):
+        if cache is not None:
+            cached = cache.get(query, page, min_year)
+            if cached is not None:
+                return [PaperRecord.from_dict(data) for data in cached]
+        papers = await fetch_scholar_page(client, query, page, min_year)
+        if cache is not None and papers:
+            cache.put(query, page, min_year, [paper.to_dict() for paper in papers])
+        return papers
+
+    results = await asyncio.gather(*(fetch_page(page) for page in range(pages)))
+    return [paper for page in results for paper in page]
+
+
+async def resolve_doi(client, paper):
+    """Look the paper's title up on Crossref and fill in its DOI when the best match agrees"""
+    if paper.doi:
+        return paper.doi
+    response = await client.get(CROSSREF_URL, params={
+        "query.bibliographic": paper.title, "rows": 1, "select": "DOI,title"})
+    if response.status_code != 200:
+        return None
+    items = response.json().get("message", {}).get("items", [])
+    if items and items[0].get("title") and \
+            normalize_title(items[0]["title"][0]) == normalize_title(paper.title):
+        paper.doi = items[0]["DOI"]
+    return paper.doi
+
+
+async def resolve_scihub_pdf(client, mirror, doi):
+    """Return the PDF URL a Sci-Hub mirror serves for doi, or None; raises if the mirror fails"""
+    response = await client.get(f"{mirror.rstrip('/')}/{doi}")
+    if response.status_code >= 500:
+        # A broken mirror, as opposed to a paper the mirror does not have
+        response.raise_for_status()
+    if response.status_code != 200:
+        return None
+    if response.headers.get("content-type", "").startswith("application/pdf"):
+        return str(response.url)
+    match = PDF_SRC_RE.search(response.text) or CITATION_PDF_RE.search(response.text)
+    if not match:
+        return None
+    src = unescape(match.group(1)).split("#")[0]
+    if src.startswith("//"):
+        return "https:" + src
+    return urljoin(str(response.url), src)
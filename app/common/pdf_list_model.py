@@ -0,0 +1,433 @@
+import os
+import time
+from array import array
+from bisect import bisect_left
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QThread, QTimer, Signal
+from qfluentwidgets import FluentIcon as FIF
+from qfluentwidgets.common.icon import Icon
+
+from app.common.content_index import highlight
+from app.common.name_index import NameIndex
+
+# Rows handed to the view per fetchMore() call
+FETCH_BATCH = 500
+
+# Full path of the PDF; Qt.UserRole holds the bare filename
+PathRole = Qt.UserRole + 1
+# HTML snippet of the page matching a content search, None otherwise
+SnippetRole = Qt.UserRole + 2
+# Whether the row matched a content search; unlike SnippetRole this never queries the index
+MatchRole = Qt.UserRole + 3
+
+# Quiet time after the last keystroke before requestFilter() filters
+FILTER_DEBOUNCE_MS = 150
+# Names added to the NameIndex per event loop turn, a few milliseconds' work
+INDEX_CHUNK = 500
+
+
+class ContentSearchThread(QThread):
+    """ Runs one ContentIndex search off the GUI thread """
+    found = Signal(object)  # Signal to emit [(path, page_index, rowid)], best first
+
+    def __init__(self, index, text, folder, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.text = text
+        self.folder = folder
+
+    def run(self):
+        self.found.emit(self.index.search(self.text, self.folder))
+
+
+class PdfListModel(QAbstractListModel):
+    """ List model over the PDFs of one folder, shared by every view that lists papers
+
+    Filenames (relative to the folder) live in one list and per-file metadata
+    in parallel arrays, filled from the scan or the first time a row is looked
+    at, so a folder of tens of thousands of files costs a few bytes per file
+    and no per-row objects. Rows reach the view in batches through
+    fetchMore(), and filtering only swaps the array of visible positions,
+    looked up in a NameIndex that is filled in small chunks between events.
+    A scan in progress appends in arrival order; sortFiles() puts the rows in
+    name order once it is done. With a ContentIndex set, the filter text is
+    searched in the papers' text instead, on a ContentSearchThread, and the
+    rows follow the ranking once it reports back.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.folder = None
+        self.names = []
+        # Per file, indexed like names: size in bytes and mtime, -1 until stat'ed
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        # Positions in names of the rows that pass the filter, in display order:
+        # ascending unless ranked by a content search
+        self.visible = array("l")
+        self.ranked = False
+        self.contentIndex = None
+        self.searchThread = None
+        # filename -> [page index, page rowid, HTML snippet or None until shown] of the
+        # last content search, best first
+        self.snippets = {}
+        self.loaded = 0
+        self.filterText = ""
+        # Compiled filterText, None when every row passes
+        self.filterQuery = None
+        # names[:indexed] are in nameIndex
+        self.nameIndex = NameIndex()
+        self.indexed = 0
+        self.indexTimer = QTimer(self)
+        self.indexTimer.timeout.connect(self._indexMore)
+        self.filterTimer = QTimer(self)
+        self.filterTimer.setSingleShot(True)
+        self.filterTimer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filterTimer.timeout.connect(lambda: self.setFilter(self.filterText))
+        self.sorted = True
+        # filename -> (label, tooltip) shown by views, e.g. batch check progress
+        self.status = {}
+        self._icon = None
+
+    def setFiles(self, folder, names, sizes=None, mtimes=None):
+        """Replace the listing with names (already sorted) from folder"""
+        self.beginResetModel()
+        self.folder = folder
+        self.names = list(names)
+        self.sizes = array("q", sizes) if sizes is not None else array("q", [-1]) * len(self.names)
+        self.mtimes = array("d", mtimes) if mtimes is not None else array("d", [-1.0]) * len(self.names)
+        self.status = {}
+        self.sorted = True
+        self.nameIndex = NameIndex()
+        self.indexed = 0
+        self.indexTimer.start()
+        self._compileFilter()
+        self._applyFilter()
+        self.endResetModel()
+
+    def startLoading(self, folder):
+        """Empty the list for a scan of folder; rows arrive through appendFiles()"""
+        self.setFiles(folder, [])
+
+    def appendFiles(self, entries):
+        """Add a batch of (name, size, mtime) while a scan is in progress"""
+        start = len(self.names)
+        for name, size, mtime in entries:
+            self.names.append(name)
+            self.sizes.append(size)
+            self.mtimes.append(mtime)
+        self.sorted = False
+        self.indexTimer.start()
+        self.visible.extend(position for position in range(start, len(self.names))
+                            if self._matches(self.names[position]))
+        # Fill the first page right away; later rows wait for fetchMore()
+        if self.loaded < FETCH_BATCH and self.loaded < len(self.visible):
+            self.fetchMore()
+
+    def sortFiles(self):
+        """Put the rows in name order, keeping the selection and other persistent indexes"""
+        if self.sorted:
+            return
+        # Positions are about to change; the index cursor only survives if it is at the end
+        self._indexMore(len(self.names))
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        names = [self.names[position] for position in order]
+        visibleNames = [names[position] for position in self._filtered(names)]
+
+        # Rows the view holds on to may move past the fetched ones; fetch up to them first
+        persistentNames = [self.names[self.visible[index.row()]] for index in self.persistentIndexList()]
+        if persistentNames:
+            rows = {name: row for row, name in enumerate(visibleNames)}
+            needed = max(rows.get(name, -1) for name in persistentNames) + 1
+        else:
+            needed = 0
+        if needed > self.loaded:
+            self.beginInsertRows(QModelIndex(), self.loaded, needed - 1)
+            self.loaded = needed
+            self.endInsertRows()
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        persistentNames = [self.names[self.visible[index.row()]] for index in persistent]
+        self.names = names
+        self.sizes = array("q", (self.sizes[position] for position in order))
+        self.mtimes = array("d", (self.mtimes[position] for position in order))
+        self.sorted = True
+        self._applyFilter(self.loaded)
+        newIndexes = []
+        for name in persistentNames:
+            row = self.rowOf(name)
+            newIndexes.append(self.index(row) if row is not None else QModelIndex())
+        self.changePersistentIndexList(persistent, newIndexes)
+        self.layoutChanged.emit()
+
+    def insertFile(self, name, size=-1, mtime=-1.0):
+        """Add one file to a sorted listing in place, or refresh its metadata if already listed"""
+        position = self.find(name)
+        if position is not None:
+            self.sizes[position], self.mtimes[position] = size, mtime
+            row = self.rowOf(name)
+            if row is not None:
+                self.dataChanged.emit(self.index(row), self.index(row), [Qt.ToolTipRole])
+            return
+        position = bisect_left(self.names, name)
+        self.names.insert(position, name)
+        self.sizes.insert(position, size)
+        self.mtimes.insert(position, mtime)
+        if position < self.indexed:
+            self.nameIndex.add(name)
+            self.indexed += 1
+        row = self._shiftVisible(position, 1)
+        if not self._matches(name) or self.ranked:
+            return
+        if row < self.loaded or self.loaded == len(self.visible):
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.visible.insert(row, position)
+            self.loaded += 1
+            self.endInsertRows()
+        else:
+            # Beyond the fetched rows: the view picks it up with fetchMore()
+            self.visible.insert(row, position)
+
+    def removeFile(self, name):
+        """Drop one file from a sorted listing in place"""
+        position = bisect_left(self.names, name)
+        if position == len(self.names) or self.names[position] != name:
+            return
+        if self.ranked:
+            row = next((row for row, shownPosition in enumerate(self.visible) if shownPosition == position),
+                       len(self.visible))
+        else:
+            row = bisect_left(self.visible, position)
+        shown = row < len(self.visible) and self.visible[row] == position
+        if shown and row < self.loaded:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        del self.names[position]
+        del self.sizes[position]
+        del self.mtimes[position]
+        self.status.pop(name, None)
+        self.snippets.pop(name, None)
+        if position < self.indexed:
+            self.nameIndex.remove(name)
+            self.indexed -= 1
+        if shown:
+            del self.visible[row]
+        self._shiftVisible(position, -1)
+        if shown and row < self.loaded:
+            self.loaded -= 1
+            self.endRemoveRows()
+
+    def _shiftVisible(self, position, delta):
+        """Move the visible positions from position on by delta; return the first row moved"""
+        if self.ranked:
+            for i, shownPosition in enumerate(self.visible):
+                if shownPosition >= position:
+                    self.visible[i] += delta
+            return len(self.visible)
+        row = bisect_left(self.visible, position)
+        for i in range(row, len(self.visible)):
+            self.visible[i] += delta
+        return row
+
+    def find(self, name):
+        """Position of name in a sorted listing, or None"""
+        position = bisect_left(self.names, name)
+        if position < len(self.names) and self.names[position] == name:
+            return position
+        return None
+
+    def namesIn(self, directory):
+        """Listed names directly inside directory ("" for the folder itself)
+
+        The names under directory are one run of the sorted listing, found by
+        bisecting on its prefix; each subfolder's run is skipped with another
+        bisect, so the cost follows the directory, not the folder.
+        """
+        names = self.names
+        if not self.sorted:
+            return [name for name in names if os.path.dirname(name) == directory]
+        prefix = os.path.join(directory, "") if directory else ""
+        found = []
+        position = bisect_left(names, prefix)
+        while position < len(names) and names[position].startswith(prefix):
+            name = names[position]
+            separator = name.find(os.sep, len(prefix))
+            if separator < 0:
+                found.append(name)
+                position += 1
+            else:
+                position = bisect_left(names, name[:separator + 1] + "\U0010ffff", position)
+        return found
+
+    def setFilter(self, text):
+        """Show only the rows matching text (see NameIndex), or every row when it is blank"""
+        self.filterTimer.stop()
+        self.beginResetModel()
+        self.filterText = text
+        self._compileFilter()
+        self._applyFilter()
+        self.endResetModel()
+
+    def setContentIndex(self, index):
+        """Search the filter text in the papers' content with index, or in filenames when None"""
+        self.contentIndex = index
+        self.setFilter(self.filterText)
+
+    def requestFilter(self, text):
+        """setFilter() once text has not changed for FILTER_DEBOUNCE_MS, e.g. while typing"""
+        self.filterText = text
+        self.filterTimer.start()
+
+    def _compileFilter(self):
+        self.snippets = {}
+        self.ranked = False
+        self.searchThread = None
+        if not self.filterText.strip():
+            self.filterQuery = None
+            return
+        if self.contentIndex is not None:
+            # No rows until the search reports back to onContentSearched()
+            self.filterQuery = self.filterText
+            self.ranked = True
+            if self.folder:
+                self.searchThread = ContentSearchThread(self.contentIndex, self.filterText, self.folder, self)
+                self.searchThread.found.connect(self.onContentSearched)
+                self.searchThread.finished.connect(self.searchThread.deleteLater)
+                self.searchThread.start()
+            return
+        self._indexMore(len(self.names))
+        self.filterQuery = self.nameIndex.query(self.filterText)
+
+    def onContentSearched(self, results):
+        if self.sender() is not self.searchThread:
+            # A search for an older filter text
+            return
+        self.searchThread = None
+        self.beginResetModel()
+        for path, page, rowid in results:
+            self.snippets.setdefault(os.path.relpath(path, self.folder), [page, rowid, None])
+        self._applyFilter()
+        self.endResetModel()
+
+    def _indexMore(self, count=INDEX_CHUNK):
+        end = min(self.indexed + count, len(self.names))
+        self.nameIndex.extend(self.names[self.indexed:end])
+        self.indexed = end
+        if end == len(self.names):
+            self.indexTimer.stop()
+            # Sort the vocabulary now rather than on the first keystroke
+            self.nameIndex.vocabulary()
+
+    def _matches(self, name):
+        if self.ranked:
+            return name in self.snippets
+        return self.filterQuery is None or self.nameIndex.matches(self.filterQuery, name)
+
+    def _filtered(self, names):
+        """Positions in names (sorted, or in scan order) of the names passing the filter"""
+        if self.filterQuery is None:
+            return range(len(names))
+        if self.ranked:
+            positions = {name: position for position, name in enumerate(names) if name in self.snippets}
+            return [positions[name] for name in self.snippets if name in positions]
+        matched = self.nameIndex.search(self.filterQuery)
+        if self.sorted and len(matched) * 16 < len(names):
+            return sorted(bisect_left(names, name) for name in matched)
+        return [position for position, name in enumerate(names) if name in matched]
+
+    def _applyFilter(self, loaded=FETCH_BATCH):
+        self.visible = array("l", self._filtered(self.names))
+        self.loaded = min(loaded, len(self.visible))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.visible)
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(FETCH_BATCH, len(self.visible) - self.loaded)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        position = self.visible[index.row()]
+        name = self.names[position]
+        if role == Qt.DisplayRole:
+            label = self.status.get(name, (None, None))[0]
+            return f"{name}  [{label}]" if label else name
+        if role == Qt.UserRole:
+            return name
+        if role == PathRole:
+            return os.path.join(self.folder, name)
+        if role == Qt.DecorationRole:
+            if self._icon is None:
+                self._icon = Icon(FIF.DOCUMENT)
+            return self._icon
+        if role == Qt.ToolTipRole:
+            return self._tooltip(position)
+        if role == SnippetRole:
+            return self._snippet(name)
+        if role == MatchRole:
+            return name in self.snippets
+        return None
+
+    def _snippet(self, name):
+        match = self.snippets.get(name)
+        if match is None or self.contentIndex is None:
+            return None
+        if match[2] is None:
+            snippet = self.contentIndex.snippet(self.filterQuery, match[1])
+            match[2] = highlight(snippet) if snippet else ""
+        return match[2]
+
+    def _tooltip(self, position):
+        name = self.names[position]
+        if self.sizes[position] < 0:
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+                self.sizes[position], self.mtimes[position] = stat.st_size, stat.st_mtime
+            except OSError:
+                self.sizes[position], self.mtimes[position] = 0, 0.0
+        lines = [f"{self.sizes[position] / 1024:.0f} KB, modified "
+                 f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(self.mtimes[position]))}"]
+        detail = self.status.get(name, (None, None))[1]
+        if detail:
+            lines.append(detail)
+        snippet = self.snippets.get(name)
+        if snippet:
+            lines.append(f"Best match on page {snippet[0] + 1}")
+        return "\n".join(lines)
+
+    def visibleNames(self):
+        """Filenames of every row passing the filter, fetched into the view or not"""
+        return [self.names[position] for position in self.visible]
+
+    def setStatus(self, name, label, detail=None):
+        """Show label next to name (and detail in its tooltip); None clears it"""
+        if label is None:
+            self.status.pop(name, None)
+        else:
+            self.status[name] = (label, detail)
+        row = self.rowOf(name)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.ToolTipRole])
+
+    def rowOf(self, name):
+        """Row of name among the rows the view has fetched, or None"""
+        if not self.sorted or self.ranked:
+            return next((row for row in range(self.loaded) if self.names[self.visible[row]] == name), None)
+        # names is sorted and visible keeps its positions in ascending order
+        position = bisect_left(self.names, name)
+        if position == len(self.names) or self.names[position] != name:
+            return None
+        row = bisect_left(self.visible, position)
+        if row < self.loaded and self.visible[row] == position:
+            return row
+        return None
@@ -0,0 +1,85 @@
+import os
+import time
+
+from PySide6.QtCore import QThread, Signal
+from loguru import logger
+
+# A batch is delivered once it has this many entries or is this many seconds old
+SCAN_BATCH = 500
+SCAN_INTERVAL = 0.1
+
+
+def scan_pdfs(folder, recursive=False, cancelled=lambda: False, directories=None, skip=(), visited=None):
+    """Yield lists of (relative path, size, mtime) for the PDFs under folder as they are found
+
+    Sizes and mtimes come from the directory entries, which costs no extra
+    round trip on Windows shares. directories limits the scan to those
+    subfolders of folder, and a recursive scan does not descend into the
+    subfolders in skip. Every folder listed is appended to visited when it
+    is given. Unreadable subfolders are skipped; an unreadable folder itself
+    raises OSError.
+    """
+    batch = []
+    started = time.monotonic()
+    pending = list(directories) if directories else [folder]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                if visited is not None:
+                    visited.append(directory)
+                for entry in entries:
+                    if cancelled():
+                        return
+                    try:
+                        if entry.is_dir():
+                            if recursive and entry.path not in skip:
+                                pending.append(entry.path)
+                            continue
+                        if not entry.name.lower().endswith(".pdf"):
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    batch.append((os.path.relpath(entry.path, folder), stat.st_size, stat.st_mtime))
+                    if len(batch) >= SCAN_BATCH or time.monotonic() - started >= SCAN_INTERVAL:
+                        yield batch
+                        batch = []
+                        started = time.monotonic()
+        except OSError as e:
+            if directory == folder:
+                raise
+            logger.warning(f"Skipping unreadable folder {directory}: {e}")
+    if batch:
+        yield batch
+
+
+class PdfScanThread(QThread):
+    """ Lists the PDFs of a folder off the GUI thread and streams them in batches """
+    found = Signal(object)  # Signal to emit a list of (relative path, size, mtime)
+    error = Signal(str)     # Signal to emit a failure to read the folder
+
+    def __init__(self, folder, recursive=False, parent=None, directories=None, skip=()):
+        super().__init__(parent)
+        self.folder = folder
+        self.recursive = recursive
+        self.directories = directories
+        self.skip = skip
+        # Every folder listed so far, for the caller to watch
+        self.visited = []
+        self.cancelled = False
+        self.failed = False
+        self.count = 0
+
+    def run(self):
+        try:
+            for batch in scan_pdfs(self.folder, self.recursive, lambda: self.cancelled, self.directories,
+                                   self.skip, self.visited):
+                self.count += len(batch)
+                self.found.emit(batch)
+        except OSError as e:
+            self.failed = True
+            self.error.emit(str(e))
+
+    def cancel(self):
+        self.cancelled = True
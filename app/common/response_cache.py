@@ -0,0 +1,93 @@
+import hashlib
+import re
+import threading
+import time
+from contextlib import closing
+
+from app.common.sqlite_store import connect
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_text(text):
+    """Collapse whitespace so re-extracted or re-saved copies of a paper hash the same"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def response_key(text, model, prompt_version):
+    """Cache key for one analysis request: normalized text + model + prompt template version"""
+    digest = hashlib.sha256()
+    digest.update(f"{model}\0{prompt_version}\0".encode("utf-8"))
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """ Persistent cache of LLM responses with TTL and size-based eviction """
+
+    def __init__(self, db_path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with closing(connect(db_path)) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY, model TEXT, response TEXT,
+                    bytes INTEGER, created REAL, last_used REAL);
+                CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER);
+                INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0);
+            """)
+
+    def get(self, key):
+        """Return the cached response for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock, closing(connect(self.db_path)) as conn, conn:
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?",
+                               (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row:
+                self.hits += 1
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+                return row[0]
+            self.misses += 1
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+            return None
+
+    def put(self, key, model, response):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, closing(connect(self.db_path)) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, model, response, size, now, now))
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, bytes FROM responses ORDER BY last_used").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        """Return hit/miss counters for this session and across all sessions"""
+        with closing(connect(self.db_path)) as conn:
+            totals = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals["hits"],
+            "total_misses": totals["misses"],
+            "hit_rate": totals["hits"] / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,53 @@
+import json
+import threading
+import time
+from contextlib import closing
+
+from app.common.sqlite_store import connect
+
+# Scholar rankings drift slowly; a day keeps "tweak and rerun" loops off the network
+DEFAULT_TTL = 24 * 3600
+
+
+def query_key(query):
+    """Normalize a query so case and spacing differences share cached pages"""
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """ Persistent cache of Scholar result pages keyed by (query, page, min_year)
+
+    Each page is stored on its own, so asking for more pages of a query that
+    was already run only fetches the new ones.
+    """
+
+    def __init__(self, db_path, ttl=DEFAULT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        with closing(connect(db_path)) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    query TEXT, page INTEGER, min_year INTEGER, results TEXT, created REAL,
+                    PRIMARY KEY (query, page, min_year))
+            """)
+
+    def get(self, query, page, min_year=None):
+        """Return the cached list of paper dicts for one result page, or None"""
+        with self._lock, closing(connect(self.db_path)) as conn:
+            row = conn.execute("SELECT results, created FROM pages WHERE query = ? AND page = ? AND min_year = ?",
+                               (query_key(query), page, min_year or 0)).fetchone()
+        if not row or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, query, page, min_year, results):
+        now = time.time()
+        with self._lock, closing(connect(self.db_path)) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                         (query_key(query), page, min_year or 0, json.dumps(results), now))
+            conn.execute("DELETE FROM pages WHERE created < ?", (now - self.ttl,))
+
+    def clear(self):
+        with self._lock, closing(connect(self.db_path)) as conn, conn:
+            conn.execute("DELETE FROM pages")
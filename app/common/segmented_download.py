@@ -0,0 +1,185 @@
+import asyncio
+import time
+
+import httpx
+from loguru import logger
+
+CHUNK_SIZE = 64 * 1024
+MIN_SEGMENT_SIZE = 512 * 1024
+DEFAULT_SEGMENTS = 4
+
+# How often autoSpeedUp re-evaluates the segment count, and the gain that justifies one more
+SCALE_INTERVAL = 1.0
+SCALE_GAIN = 1.1
+
+# Extra requests for a segment whose response ended before its range did
+SEGMENT_RETRIES = 3
+
+
+class RangeNotSupported(Exception):
+    """ The server answered a Range request with something other than the requested bytes """
+
+
+class IncompleteDownload(Exception):
+    """ Some bytes of the file could not be fetched """
+
+
+class Segment:
+    """ Byte range [pos, end) still to be fetched; end shrinks when another worker takes the tail """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.pos = start
+        self.end = end
+
+    @property
+    def remaining(self):
+        return max(0, self.end - self.pos)
+
+
+class SegmentedDownload:
+    """ Fetch one file with parallel HTTP Range requests into a preallocated file
+
+    Workers write their segment straight to its offset. A worker that finishes
+    steals half of the largest remaining segment, so the count of live segments
+    follows `target`. With auto_scale the target is raised while the aggregate
+    throughput keeps improving and lowered when the extra segment did not help,
+    always between 1 and max_segments.
+    """
+
+    def __init__(self, client, url, path, size, max_segments, auto_scale=True,
+                 offset=0, on_bytes=None, segments=None, throttle=None):
+        self.client = client
+        self.url = url
+        self.path = path
+        self.size = size
+        self.max_segments = max(1, max_segments)
+        self.auto_scale = auto_scale
+        self.offset = offset
+        self.on_bytes = on_bytes
+        # Optional coroutine function throttle(size) awaited before each chunk is written
+        self.throttle = throttle
+        # Ranges left over from a paused download, as [(pos, end)]
+        self.resume_segments = [(pos, end) for pos, end in segments or [] if end > pos]
+        self.received = offset
+        self.segments = []
+        self.active = 0
+        if auto_scale:
+            self.target = min(2, self.max_segments)
+        else:
+            self.target = min(DEFAULT_SEGMENTS, self.max_segments)
+        self._workers = []
+
+    def checkpoint(self):
+        """Return the ranges still missing as [(pos, end)], to resume the download later"""
+        return [(seg.pos, seg.end) for seg in self.segments if seg.remaining]
+
+    def _split_largest(self):
+        """Split the largest remaining segment in two and return the new tail segment"""
+        largest = max(self.segments, key=lambda seg: seg.remaining, default=None)
+        if largest is None or largest.remaining < 2 * MIN_SEGMENT_SIZE:
+            return None
+        middle = largest.pos + largest.remaining // 2
+        tail = Segment(middle, largest.end)
+        largest.end = middle
+        self.segments.append(tail)
+        return tail
+
+    async def _fetch_segment(self, segment):
+        headers = {"Range": f"bytes={segment.pos}-{segment.end - 1}"}
+        async with self.client.stream("GET", self.url, headers=headers) as response:
+            if response.status_code != 206:
+                raise RangeNotSupported(f"HTTP {response.status_code} for ranged request")
+            with open(self.path, "r+b") as f:
+                f.seek(segment.pos)
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    if self.throttle:
+                        await self.throttle(len(chunk))
+                    # The tail may have been handed to another worker meanwhile
+                    chunk = chunk[:segment.remaining]
+                    f.write(chunk)
+                    segment.pos += len(chunk)
+                    self.received += len(chunk)
+                    if self.on_bytes:
+                        self.on_bytes(self.received, self.size)
+                    if segment.remaining == 0:
+                        break
+
+    async def _fetch_complete(self, segment):
+        """Fetch a segment to its end, asking again for the rest when a response stops short"""
+        for attempt in range(SEGMENT_RETRIES + 1):
+            try:
+                await self._fetch_segment(segment)
+            except httpx.TransportError as e:
+                logger.warning(f"Ranged request for {self.url} broke off: {e}")
+            if not segment.remaining:
+                return
+            logger.info(f"Segment of {self.url} ended {segment.remaining} bytes short, attempt {attempt + 1}")
+        raise IncompleteDownload(f"{segment.remaining} bytes at {segment.pos} still missing "
+                                 f"after {SEGMENT_RETRIES} retries")
+
+    async def _worker(self, segment):
+        self.active += 1
+        try:
+            while segment is not None:
+                await self._fetch_complete(segment)
+                self.segments.remove(segment)
+                segment = self._split_largest() if self.active <= self.target else None
+        finally:
+            self.active -= 1
+
+    def _spawn(self, segment):
+        self._workers.append(asyncio.ensure_future(self._worker(segment)))
+
+    async def _scale(self):
+        """Grow the segment count while throughput improves, shrink it when it stops helping"""
+        last_rate = None
+        last_bytes, last_time = self.received, time.monotonic()
+        while any(not worker.done() for worker in self._workers):
+            await asyncio.sleep(SCALE_INTERVAL)
+            now = time.monotonic()
+            rate = (self.received - last_bytes) / (now - last_time)
+            last_bytes, last_time = self.received, now
+            if last_rate is None or rate > last_rate * SCALE_GAIN:
+                if self.target < self.max_segments:
+                    segment = self._split_largest()
+                    if segment is not None:
+                        self.target += 1
+                        self._spawn(segment)
+            elif rate < last_rate and self.target > 1:
+                # The last extra segment made things worse; the next worker to finish retires
+                self.target -= 1
+            last_rate = rate
+
+    async def run(self):
+        """Download the whole file and return its size
+
+        Raises RangeNotSupported if the server ignores ranges and
+        IncompleteDownload if bytes are still missing at the end.
+        """
+        resuming = self.offset or self.resume_segments
+        with open(self.path, "r+b" if resuming else "wb") as f:
+            f.truncate(self.size)
+
+        if self.resume_segments:
+            self.segments = [Segment(pos, end) for pos, end in self.resume_segments]
+            self.received = self.size - sum(seg.remaining for seg in self.segments)
+        else:
+            step = max(MIN_SEGMENT_SIZE, (self.size - self.offset) // self.target)
+            starts = list(range(self.offset, self.size, step))[:self.target]
+            bounds = starts + [self.size]
+            self.segments = [Segment(a, b) for a, b in zip(bounds, bounds[1:])]
+        for segment in list(self.segments):
+            self._spawn(segment)
+
+        scaler = asyncio.ensure_future(self._scale()) if self.auto_scale else None
+        try:
+            # Workers may be added while waiting, so wait until none are left running
+            while any(not worker.done() for worker in self._workers):
+                await asyncio.gather(*self._workers)
+        finally:
+            for task in self._workers + ([scaler] if scaler else []):
+                task.cancel()
+        if self.received != self.size:
+            raise IncompleteDownload(f"Received {self.received} of {self.size} bytes")
+        return self.received
@@ -0,0 +1,13 @@
+import os
+import sqlite3
+
+
+def connect(db_path):
+    """Open a SQLite connection in WAL mode, creating the parent folder if needed"""
+    folder = os.path.dirname(db_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
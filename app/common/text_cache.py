@@ -0,0 +1,111 @@
+import hashlib
+import os
+import threading
+import time
+import zlib
+from contextlib import closing
+
+from app.common.sqlite_store import connect
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Seconds between prunes of the ContentIndex, which stat every file it links
+PRUNE_INTERVAL = 3600
+
+
+def file_digest(file_path):
+    """Return the SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TextCache:
+    """ On-disk cache of extracted PDF text keyed by content hash
+
+    Pages are stored zlib-compressed. A (path, size, mtime) table lets unchanged
+    files skip hashing, and documents are evicted least recently used first once
+    the compressed total exceeds max_bytes. With a ContentIndex, every document
+    looked up or stored is also made searchable. Eviction leaves a document
+    indexed, but also prunes the index of files that are gone and of the
+    documents they leave unlinked, at most once every PRUNE_INTERVAL.
+    """
+
+    def __init__(self, db_path, max_bytes=DEFAULT_MAX_BYTES, index=None):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.index = index
+        self._pruned = 0.0
+        self._lock = threading.Lock()
+        with closing(connect(db_path)) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT);
+                CREATE TABLE IF NOT EXISTS docs (
+                    digest TEXT PRIMARY KEY, bytes INTEGER, last_used REAL);
+                CREATE TABLE IF NOT EXISTS pages (
+                    digest TEXT, idx INTEGER, data BLOB, PRIMARY KEY (digest, idx));
+            """)
+
+    def digest(self, file_path):
+        """Return the content digest of file_path, hashing only if size or mtime changed"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with closing(connect(self.db_path)) as conn:
+            row = conn.execute("SELECT size, mtime_ns, digest FROM files WHERE path = ?",
+                               (path,)).fetchone()
+            if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+                digest = row[2]
+            else:
+                digest = file_digest(path)
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                                 (path, stat.st_size, stat.st_mtime_ns, digest))
+        if self.index is not None:
+            self.index.link(path, digest)
+        return digest
+
+    def get(self, digest):
+        """Return the cached [(page_index, text)] for digest, or None"""
+        with closing(connect(self.db_path)) as conn:
+            rows = conn.execute("SELECT idx, data FROM pages WHERE digest = ? ORDER BY idx",
+                                (digest,)).fetchall()
+            if not rows and not conn.execute("SELECT 1 FROM docs WHERE digest = ?",
+                                             (digest,)).fetchone():
+                return None
+            with conn:
+                conn.execute("UPDATE docs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        pages = [(idx, zlib.decompress(data).decode("utf-8")) for idx, data in rows]
+        if self.index is not None and not self.index.has(digest):
+            # Cached before the index existed
+            self.index.add(digest, pages)
+        return pages
+
+    def put(self, digest, pages):
+        """Store [(page_index, text)] for digest and evict old documents if over budget"""
+        blobs = [(digest, i, zlib.compress(text.encode("utf-8"))) for i, text in pages]
+        size = sum(len(blob) for _, _, blob in blobs)
+        with self._lock, closing(connect(self.db_path)) as conn, conn:
+            conn.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+            conn.executemany("INSERT INTO pages VALUES (?, ?, ?)", blobs)
+            conn.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?)", (digest, size, time.time()))
+            evicted = self._evict(conn)
+        if self.index is not None:
+            self.index.add(digest, pages)
+            if evicted and time.time() - self._pruned >= PRUNE_INTERVAL:
+                self._pruned = time.time()
+                self.index.prune()
+
+    def _evict(self, conn):
+        """Drop least recently used documents while over max_bytes; return whether any was"""
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM docs").fetchone()[0]
+        if total <= self.max_bytes:
+            return False
+        for digest, size in conn.execute("SELECT digest, bytes FROM docs ORDER BY last_used").fetchall():
+            conn.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+            conn.execute("DELETE FROM docs WHERE digest = ?", (digest,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        return True
@@ -0,0 +1,237 @@
+import time
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PySide6.QtWidgets import QHeaderView, QVBoxLayout, QWidget
+from qfluentwidgets import BodyLabel, TableView
+
+from ..common.download_engine import QUEUED, STARTED, BYTES, DONE, SKIPPED_DUPLICATE, FAILED
+
+# Seconds between throughput samples
+RATE_INTERVAL_MS = 1000
+
+# Weight of the newest sample in each row's smoothed rate
+RATE_ALPHA = 0.5
+
+# Widths of the columns after the title, which takes the remaining space
+COLUMN_WIDTHS = (140, 100, 80, 90, 100, 80)
+
+STATE_TEXT = {
+    QUEUED: "Queued",
+    STARTED: "Resolving",
+    BYTES: "Downloading",
+    DONE: "Done",
+    SKIPPED_DUPLICATE: "Duplicate",
+    FAILED: "Failed",
+}
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class DownloadRow:
+    """ What the table knows about one paper """
+
+    def __init__(self, paper, query=None):
+        self.paper = paper
+        self.query = query or ""
+        self.state = QUEUED
+        self.received = 0
+        self.total = 0
+        self.rate = 0.0
+        self.sampled = 0
+        self.detail = ""
+
+    @property
+    def active(self):
+        return self.state in (STARTED, BYTES)
+
+    @property
+    def eta(self):
+        if self.state != BYTES or not self.total or self.rate <= 0:
+            return None
+        return (self.total - self.received) / self.rate
+
+
+class DownloadTableModel(QAbstractTableModel):
+    """ One row per paper, fed with DownloadEvents; rates are sampled on a timer """
+
+    COLUMNS = ["Title", "Query", "State", "Progress", "Size", "Speed", "ETA"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        # (query, paper filename) -> row number
+        self.positions = {}
+        self.sampledAt = time.monotonic()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.ToolTipRole:
+            return row.detail or row.paper.title
+        if role == Qt.TextAlignmentRole and column > 2:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role != Qt.DisplayRole:
+            return None
+        if column == 0:
+            return row.paper.title
+        if column == 1:
+            return row.query
+        if column == 2:
+            return STATE_TEXT[row.state]
+        if column == 3:
+            return f"{100 * row.received / row.total:.0f}%" if row.total else ""
+        if column == 4:
+            return format_size(row.total or row.received) if row.total or row.received else ""
+        if column == 5:
+            return f"{format_size(row.rate)}/s" if row.rate and row.state in (BYTES, DONE) else ""
+        if column == 6:
+            return format_duration(row.eta) if row.eta is not None else ""
+        return None
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.positions = {}
+        self.endResetModel()
+
+    def applyEvent(self, event):
+        key = (event.query, event.paper.filename)
+        if key not in self.positions:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows))
+            self.positions[key] = len(self.rows)
+            self.rows.append(DownloadRow(event.paper, event.query))
+            self.endInsertRows()
+        position = self.positions[key]
+        row = self.rows[position]
+
+        if event.kind == BYTES and (row.state != BYTES or row.sampled > event.received):
+            # Bytes from before this transfer started (a resumed file) are not throughput
+            row.sampled = event.received
+        row.state = event.kind
+        if event.kind == QUEUED:
+            row.received = row.total = 0
+            row.rate = 0.0
+            row.detail = ""
+        elif event.kind == BYTES:
+            row.received, row.total = event.received, event.total
+        elif event.kind == DONE:
+            row.received, row.total = event.received, event.total
+            # The finished row shows its average rate
+            row.rate = event.received / event.elapsed if event.elapsed else 0.0
+        elif event.kind == SKIPPED_DUPLICATE:
+            # Nothing was kept; the bytes fetched before the duplicate was found don't count
+            row.received = row.total = 0
+            row.detail = f"Already downloaded as {event.path}"
+        elif event.kind == FAILED:
+            row.detail = event.error or ""
+        self.dataChanged.emit(self.index(position, 2), self.index(position, len(self.COLUMNS) - 1))
+
+    def requeueActive(self):
+        """Show unfinished rows as queued again, e.g. after the run was paused"""
+        for position, row in enumerate(self.rows):
+            if row.active:
+                row.state = QUEUED
+                row.rate = 0.0
+                self.dataChanged.emit(self.index(position, 2), self.index(position, len(self.COLUMNS) - 1))
+
+    def sampleRates(self):
+        """Update the smoothed per-row rates and return the aggregate bytes/s"""
+        now = time.monotonic()
+        elapsed = max(now - self.sampledAt, 1e-3)
+        self.sampledAt = now
+        total = 0.0
+        for position, row in enumerate(self.rows):
+            if not row.active:
+                continue
+            rate = (row.received - row.sampled) / elapsed
+            row.sampled = row.received
+            row.rate = rate if row.rate == 0 else row.rate + RATE_ALPHA * (rate - row.rate)
+            total += rate
+            self.dataChanged.emit(self.index(position, 5), self.index(position, 6))
+        return total
+
+    def counts(self):
+        counts = dict.fromkeys(STATE_TEXT, 0)
+        for row in self.rows:
+            counts[row.state] += 1
+        return counts
+
+
+class DownloadTable(QWidget):
+    """ Table of per-paper download state and throughput, with an aggregate summary line """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.downloadModel = DownloadTableModel(self)
+        self.summaryLabel = BodyLabel(self)
+        self.tableView = TableView(self)
+        self.tableView.setModel(self.downloadModel)
+        self.tableView.setWordWrap(False)
+        self.tableView.verticalHeader().hide()
+        self.tableView.setEditTriggers(TableView.NoEditTriggers)
+        # Fixed widths: sizing to contents would rescan every row on each update
+        header = self.tableView.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Fixed)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for column, width in enumerate(COLUMN_WIDTHS, 1):
+            header.resizeSection(column, width)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.summaryLabel)
+        layout.addWidget(self.tableView)
+
+        self.rateTimer = QTimer(self)
+        self.rateTimer.setInterval(RATE_INTERVAL_MS)
+        self.rateTimer.timeout.connect(self.updateSummary)
+        self.updateSummary()
+
+    def applyEvent(self, event):
+        self.downloadModel.applyEvent(event)
+        if not self.rateTimer.isActive():
+            self.downloadModel.sampledAt = time.monotonic()
+            self.rateTimer.start()
+
+    def clear(self):
+        self.downloadModel.clear()
+        self.updateSummary()
+
+    def stop(self):
+        """Freeze the table when the run ends; rows still in progress go back to queued"""
+        self.downloadModel.requeueActive()
+        self.updateSummary()
+
+    def updateSummary(self):
+        rate = self.downloadModel.sampleRates()
+        counts = self.downloadModel.counts()
+        active = counts[STARTED] + counts[BYTES]
+        if not active:
+            self.rateTimer.stop()
+        self.summaryLabel.setText(
+            f"{active} active · {format_size(rate)}/s · {counts[QUEUED]} queued · "
+            f"{counts[DONE]} done · {counts[SKIPPED_DUPLICATE]} duplicates · {counts[FAILED]} failed")
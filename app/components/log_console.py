@@ -0,0 +1,123 @@
+import os
+from collections import deque
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PySide6.QtGui import QGuiApplication, QKeySequence
+from PySide6.QtWidgets import QAbstractItemView, QListView
+
+# Lines kept in memory; older ones drop off the top (and survive only in the spill file)
+DEFAULT_CAPACITY = 5000
+
+# Pending lines are flushed into the view at most this often (~30 Hz)
+FLUSH_INTERVAL_MS = 33
+
+
+class LogModel(QAbstractListModel):
+    """ Fixed-capacity ring buffer of log lines exposed as a list model """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.lines = deque(maxlen=capacity)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        return self.lines[index.row()]
+
+    def extend(self, lines):
+        """Append lines, dropping the oldest rows once the buffer is full"""
+        capacity = self.lines.maxlen
+        lines = lines[-capacity:]
+        overflow = len(self.lines) + len(lines) - capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self.lines.popleft()
+            self.endRemoveRows()
+        start = len(self.lines)
+        self.beginInsertRows(QModelIndex(), start, start + len(lines) - 1)
+        self.lines.extend(lines)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.lines.clear()
+        self.endResetModel()
+
+
+class LogConsole(QListView):
+    """ Read-only log view for long runs
+
+    append() only queues text; a timer moves queued lines into a bounded
+    LogModel in one batch per tick, and the list view lays out just the rows
+    on screen. It follows the tail unless the user has scrolled up. With a
+    spill_path, every line is also appended to that file so the full log
+    outlives the ring buffer.
+    """
+
+    def __init__(self, parent=None, capacity=DEFAULT_CAPACITY, spill_path=None):
+        super().__init__(parent)
+        self.logModel = LogModel(capacity, self)
+        self.setModel(self.logModel)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+
+        self.pending = []
+        self.spill_path = None
+        self.spill_file = None
+        self.setSpillPath(spill_path)
+
+        self.flushTimer = QTimer(self)
+        self.flushTimer.setInterval(FLUSH_INTERVAL_MS)
+        self.flushTimer.setSingleShot(True)
+        self.flushTimer.timeout.connect(self.flush)
+
+    def setSpillPath(self, path):
+        """Also write every line to path (appending), or stop doing so when path is None"""
+        if self.spill_file:
+            self.spill_file.close()
+            self.spill_file = None
+        self.spill_path = path
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.spill_file = open(path, "a", encoding="utf-8")
+
+    def append(self, text):
+        self.pending.extend(str(text).split("\n"))
+        if not self.flushTimer.isActive():
+            self.flushTimer.start()
+
+    def flush(self):
+        if not self.pending:
+            return
+        lines, self.pending = self.pending, []
+        if self.spill_file:
+            self.spill_file.write("\n".join(lines) + "\n")
+            self.spill_file.flush()
+
+        scrollBar = self.verticalScrollBar()
+        follow = scrollBar.value() >= scrollBar.maximum()
+        self.logModel.extend(lines)
+        if follow:
+            self.scrollToBottom()
+
+    def clear(self):
+        self.pending = []
+        self.logModel.clear()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            QGuiApplication.clipboard().setText("\n".join(self.logModel.lines[row] for row in rows))
+            return
+        super().keyPressEvent(event)
+
+    def closeEvent(self, event):
+        self.flush()
+        self.setSpillPath(None)
+        super().closeEvent(event)
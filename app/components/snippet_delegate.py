@@ -0,0 +1,48 @@
+import html
+
+from PySide6.QtGui import QTextDocument
+from PySide6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+from app.common.pdf_list_model import MatchRole, SnippetRole
+
+# Lines of snippet text shown under the filename
+SNIPPET_LINES = 2
+
+
+class SnippetDelegate(QStyledItemDelegate):
+    """ Draws rows with a content search snippet as the filename over the snippet, matches in bold
+
+    Rows that are no content match are drawn as usual. Every match is one
+    snippet taller, decided without cutting the snippet, so the view can keep
+    uniform item sizes and snippets are only cut for the rows painted.
+    """
+
+    def paint(self, painter, option, index):
+        if not index.data(MatchRole):
+            super().paint(painter, option, index)
+            return
+        snippet = index.data(SnippetRole) or ""
+
+        options = QStyleOptionViewItem(option)
+        self.initStyleOption(options, index)
+        text, options.text = options.text, ""
+        style = options.widget.style() if options.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, options, painter, options.widget)
+
+        rect = style.subElementRect(QStyle.SE_ItemViewItemText, options, options.widget)
+        document = QTextDocument()
+        document.setDefaultFont(options.font)
+        document.setDocumentMargin(0)
+        document.setTextWidth(rect.width())
+        document.setHtml(f"{html.escape(text)}<br><span style='color: #606060'>{snippet}</span>")
+        painter.save()
+        painter.translate(rect.topLeft())
+        painter.setClipRect(rect.translated(-rect.topLeft()))
+        document.drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        if index.data(MatchRole):
+            size.setHeight(size.height() + option.fontMetrics.lineSpacing() * SNIPPET_LINES)
+        return size
@@ -1,32 +1,99 @@
 from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtGui import QTextCursor
 from PySide6.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, 
-                               QListWidget, QTextEdit)
-from qfluentwidgets import (FluentIcon as FIF, SmoothScrollArea, PrimaryPushButton,
-                           SearchLineEdit, InfoBar, InfoBarPosition, TextEdit)
-from app.common.paper_check import check_paper
-from app.common.pdf_manager import select_pdf_folder, load_pdfs_to_list, filter_pdfs, open_pdf
+                               QListView, QTextEdit)
+from qfluentwidgets import (FluentIcon as FIF, SmoothScrollArea, PrimaryPushButton, PushButton,
+                           SearchLineEdit, InfoBar, InfoBarPosition, TextEdit, CheckBox)
+from app.common.batch_check import BatchChecker
+from app.common.config import cfg
+from app.common.content_index import ContentIndex
+from app.common.job_queue import JobQueue, EXTRACTING, ANALYSING, DONE, FAILED, CANCELLED
+from app.common.paper_check import analyze_pages, configure_service, iter_pages, set_max_in_flight
+from app.common.response_cache import ResponseCache
+from app.common.text_cache import TextCache, file_digest
+from app.common.pdf_list_model import PdfListModel, PathRole
+from app.common.pdf_manager import select_pdf_folder, filter_pdfs, open_pdf
+from app.common.folder_index import FolderIndex, PdfFolderSync
 from app.components.loading_screen import LoadingScreen
+from app.components.snippet_delegate import SnippetDelegate
 import os
+import time
+
+
+def path_key(path):
+    """Comparable form of a path: resumed jobs store abspath, the folder comes from a file dialog"""
+    return os.path.normcase(os.path.abspath(path))
 
 
 class PaperCheckThread(QThread):
     finished = Signal(str)  # Signal to emit the result
     error = Signal(str)     # Signal to emit any errors
     progress = Signal(str)  # Signal to emit progress updates
+    delta = Signal(str)     # Signal to emit streamed output as it arrives
     
-    def __init__(self, pdf_path):
+    def __init__(self, pdf_path, text_cache=None, response_cache=None, job_queue=None):
         super().__init__()
         self.pdf_path = pdf_path
+        self.text_cache = text_cache
+        self.response_cache = response_cache
+        self.job_queue = job_queue
         
     def run(self):
+        job_id = None
         try:
             self.progress.emit("Starting paper analysis...")
-            result = check_paper(self.pdf_path)
+            if self.job_queue:
+                # Recorded like a batch item, so a later batch can reuse the result by digest
+                job_id = self.job_queue.enqueue([self.pdf_path])[0]
+                self.job_queue.update(job_id, state=EXTRACTING, started_at=time.time())
+                digest = self.text_cache.digest(self.pdf_path) if self.text_cache else file_digest(self.pdf_path)
+                self.job_queue.update(job_id, digest=digest)
+
+            start = time.perf_counter()
+            pages = []
+            for i, text in iter_pages(self.pdf_path, cfg.get(cfg.extractWorkers), self.text_cache):
+                pages.append((i, text))
+                self.progress.emit(f"Extracted page {i + 1}...")
+            extract_time = time.perf_counter() - start
+            if job_id is not None:
+                self.job_queue.update(job_id, state=ANALYSING, extract_time=extract_time)
+
+            start = time.perf_counter()
+            result = analyze_pages(pages, self.response_cache, self.delta.emit)
+            if job_id is not None:
+                self.job_queue.update(job_id, state=DONE, result=result,
+                                      analyse_time=time.perf_counter() - start, finished_at=time.time())
             self.finished.emit(result)
         except Exception as e:
+            if job_id is not None:
+                self.job_queue.update(job_id, state=FAILED, error=str(e), finished_at=time.time())
             self.error.emit(str(e))
 
 
+class BatchCheckThread(QThread):
+    itemStatus = Signal(object)  # Signal to emit a BatchItem whenever its state changes
+
+    def __init__(self, pdf_paths, text_cache=None, response_cache=None, job_queue=None, resume=False):
+        super().__init__()
+        options = dict(
+            workers=cfg.get(cfg.batchWorkers),
+            extract_workers=cfg.get(cfg.extractWorkers),
+            cache=text_cache,
+            response_cache=response_cache,
+            on_status=self.itemStatus.emit
+        )
+        if resume:
+            self.checker = BatchChecker.resume(job_queue, **options)
+        else:
+            self.checker = BatchChecker(pdf_paths, queue=job_queue, **options)
+
+    def run(self):
+        self.checker.run()
+
+    def cancel(self):
+        self.checker.cancel()
+
+
 class PaperCheckInterface(SmoothScrollArea):
     """ Paper Check Interface """
 
@@ -34,8 +101,19 @@ class PaperCheckInterface(SmoothScrollArea):
         super().__init__(parent=parent)
         self.current_folder = None
         self.check_thread = None
+        self.batch_thread = None
+        self.batch_results = {}
         self.loading_screen = None
+        self.streamed = False
+        self.content_index = ContentIndex(os.path.join(cfg.appPath, "cache", "content.db"))
+        self.text_cache = TextCache(os.path.join(cfg.appPath, "cache", "pdf_text.db"), index=self.content_index)
+        self.response_cache = ResponseCache(os.path.join(cfg.appPath, "cache", "responses.db"))
+        self.job_queue = JobQueue(os.path.join(cfg.appPath, "jobs.db"))
+        self.folder_index = FolderIndex(os.path.join(cfg.appPath, "cache", "folders.db"))
+        configure_service(max_in_flight=cfg.get(cfg.maxInFlight))
+        cfg.maxInFlight.valueChanged.connect(set_max_in_flight)
         self.setupUi()
+        self.resumePendingJobs()
 
     def setupUi(self):
         self.setObjectName("PaperCheckInterface")
@@ -58,6 +136,11 @@ class PaperCheckInterface(SmoothScrollArea):
         self.searchEdit.textChanged.connect(self.filterPdfs)
         self.horizontalLayout.addWidget(self.searchEdit)
 
+        # Search the text of checked papers instead of their filenames
+        self.contentSearchBox = CheckBox("Search contents", self)
+        self.contentSearchBox.stateChanged.connect(self.onContentSearchToggled)
+        self.horizontalLayout.addWidget(self.contentSearchBox)
+
         self.expandLayout.addLayout(self.horizontalLayout)
 
         # Create horizontal layout for PDF list and text edit
@@ -74,26 +157,41 @@ class PaperCheckInterface(SmoothScrollArea):
         self.checkButton.clicked.connect(self.checkSelectedPdf)
         self.checkButton.setEnabled(False)  # Disable initially
         self.leftLayout.addWidget(self.checkButton)
+
+        # Add Check All button for batch checking every visible PDF
+        self.checkAllButton = PushButton()
+        self.checkAllButton.setIcon(FIF.LIBRARY)
+        self.checkAllButton.setText("Check All")
+        self.checkAllButton.clicked.connect(self.checkAllPdfs)
+        self.leftLayout.addWidget(self.checkAllButton)
         
-        self.pdfList = QListWidget()
+        self.pdfModel = PdfListModel(self)
+        self.folderSync = PdfFolderSync(self.pdfModel, self.folder_index, self)
+        self.folderSync.loaded.connect(self.onPdfsLoaded)
+        self.folderSync.error.connect(self.onScanError)
+        self.pdfList = QListView()
+        self.pdfList.setModel(self.pdfModel)
+        self.pdfList.setItemDelegate(SnippetDelegate(self.pdfList))
+        self.pdfList.setUniformItemSizes(True)
+        self.pdfList.setEditTriggers(QListView.NoEditTriggers)
         self.pdfList.setStyleSheet("""
-            QListWidget {
+            QListView {
                 border: 1px solid #ccc;
                 border-radius: 5px;
                 padding: 5px;
                 background-color: white;
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 5px;
                 border-bottom: 1px solid #eee;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #e6f3ff;
                 color: black;
             }
         """)
-        self.pdfList.itemDoubleClicked.connect(self.openPdf)
-        self.pdfList.itemSelectionChanged.connect(self.onPdfSelectionChanged)
+        self.pdfList.doubleClicked.connect(self.openPdf)
+        self.pdfList.selectionModel().selectionChanged.connect(self.onPdfSelectionChanged)
         self.leftLayout.addWidget(self.pdfList)
         self.contentLayout.addWidget(self.leftWidget)
 
@@ -133,30 +231,84 @@ class PaperCheckInterface(SmoothScrollArea):
             self.loadPdfs(folder)
 
     def loadPdfs(self, folder_path):
-        """Load all PDFs from the selected folder"""
-        load_pdfs_to_list(folder_path, self.pdfList, self)
+        """Show the PDFs of the selected folder and keep the list in step with it"""
+        self.folderSync.open(folder_path, cfg.get(cfg.scanSubfolders))
+
+    def onScanError(self, message):
+        InfoBar.error(
+            title='Error',
+            content=f'Failed to load PDFs: {message}',
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            parent=self
+        )
+
+    def onPdfsLoaded(self, count):
+        InfoBar.success(
+            title='Success',
+            content=f'Found {count} PDF files',
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=2000,
+            parent=self
+        )
 
     def filterPdfs(self, text):
         """Filter PDFs based on search text"""
-        filter_pdfs(self.pdfList, text)
+        filter_pdfs(self.pdfModel, text)
 
-    def openPdf(self, item):
+    def onContentSearchToggled(self):
+        """Switch the search box between filenames and the text of checked papers"""
+        # Uniform item sizes stay on: every row of a content search is a match and equally
+        # tall, and the model reset when the results arrive re-measures the rows
+        if self.contentSearchBox.isChecked():
+            self.searchEdit.setPlaceholderText("Search contents of checked PDFs")
+            self.pdfModel.setContentIndex(self.content_index)
+        else:
+            self.searchEdit.setPlaceholderText("Search PDFs")
+            self.pdfModel.setContentIndex(None)
+
+    def openPdf(self, index):
         """Open the selected PDF file"""
         if self.current_folder:
-            pdf_path = os.path.join(self.current_folder, item.text())
-            open_pdf(pdf_path, self)
+            open_pdf(index.data(PathRole), self)
+
+    def selectedPdfPath(self):
+        """Full path of the selected PDF, or None"""
+        selected = self.pdfList.selectionModel().selectedIndexes()
+        return selected[0].data(PathRole) if selected and self.current_folder else None
 
     def onPdfSelectionChanged(self):
-        """Enable/disable check button based on selection"""
-        self.checkButton.setEnabled(bool(self.pdfList.selectedItems()))
+        """Enable/disable check button based on selection and show any batch result"""
+        pdf_path = self.selectedPdfPath()
+        self.checkButton.setEnabled(bool(pdf_path) and self.check_thread is None)
+        if not pdf_path or self.check_thread:
+            return
+
+        batch_item = self.batch_results.get(path_key(pdf_path))
+        if batch_item:
+            status, result, error = batch_item.status, batch_item.result, batch_item.error
+        else:
+            # Fall back to results recorded by earlier sessions
+            job = self.job_queue.latest(pdf_path)
+            if not job:
+                return
+            status, result, error = job["state"], job["result"], job["error"]
+
+        if status == DONE:
+            self.outputTextEdit.setMarkdown(result)
+        elif status == FAILED:
+            self.outputTextEdit.setPlainText(f"Error during analysis: {error}")
 
     def checkSelectedPdf(self):
         """Check the selected PDF for errors"""
-        selected_items = self.pdfList.selectedItems()
-        if not selected_items or not self.current_folder:
+        pdf_path = self.selectedPdfPath()
+        if not pdf_path:
             return
 
-        pdf_path = os.path.join(self.current_folder, selected_items[0].text())
+        self.checkButton.setEnabled(False)
         self.outputTextEdit.clear()
         self.outputTextEdit.setMarkdown("*Analyzing PDF... Please wait...*")
         
@@ -164,10 +316,12 @@ class PaperCheckInterface(SmoothScrollArea):
         self.loading_screen.show()
         
         # Create and start the analysis thread
-        self.check_thread = PaperCheckThread(pdf_path)
+        self.check_thread = PaperCheckThread(pdf_path, self.text_cache, self.response_cache, self.job_queue)
         self.check_thread.finished.connect(self.onAnalysisComplete)
         self.check_thread.error.connect(self.onAnalysisError)
         self.check_thread.progress.connect(self.onAnalysisProgress)
+        self.check_thread.delta.connect(self.onAnalysisDelta)
+        self.streamed = False
         self.check_thread.start()
     
     def onAnalysisProgress(self, message):
@@ -175,15 +329,34 @@ class PaperCheckInterface(SmoothScrollArea):
         self.loading_screen.setLoadingText(message)
         self.outputTextEdit.append(message)
     
+    def onAnalysisDelta(self, text):
+        """Append streamed output as it arrives"""
+        if not self.streamed:
+            # First token: drop the overlay and progress lines and show the report itself
+            self.streamed = True
+            self.loading_screen.hide()
+            self.outputTextEdit.clear()
+
+        cursor = self.outputTextEdit.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self.outputTextEdit.verticalScrollBar().setValue(
+            self.outputTextEdit.verticalScrollBar().maximum()
+        )
+
     def onAnalysisComplete(self, result):
         """Handle successful analysis completion"""
         # Hide loading screen
         self.loading_screen.hide()
         
-        self.outputTextEdit.append("\nAnalysis Complete!\n")
-        self.outputTextEdit.append("Summary of Findings:")
-        self.outputTextEdit.append(result)
-        self.outputTextEdit.setMarkdown(self.outputTextEdit.toPlainText())
+        if self.streamed:
+            # Re-render the streamed plain text as markdown
+            self.outputTextEdit.setMarkdown(result)
+        else:
+            self.outputTextEdit.append("\nAnalysis Complete!\n")
+            self.outputTextEdit.append("Summary of Findings:")
+            self.outputTextEdit.append(result)
+            self.outputTextEdit.setMarkdown(self.outputTextEdit.toPlainText())
         
         # Stop loading animation
         self.checkButton.setEnabled(True)
@@ -214,3 +387,84 @@ class PaperCheckInterface(SmoothScrollArea):
         
         # Clean up thread
         self.check_thread = None
+
+    def checkAllPdfs(self):
+        """Check every visible PDF in the background, or stop the running batch"""
+        if self.batch_thread:
+            self.batch_thread.cancel()
+            self.checkAllButton.setText("Stopping...")
+            self.checkAllButton.setEnabled(False)
+            return
+        if not self.current_folder:
+            return
+
+        # Every row passing the filter, including those the view has not fetched yet
+        paths = [os.path.join(self.current_folder, name) for name in self.pdfModel.visibleNames()]
+        if not paths:
+            return
+
+        self.startBatch(BatchCheckThread(paths, self.text_cache, self.response_cache, self.job_queue))
+
+    def resumePendingJobs(self):
+        """Resume checks left unfinished by a previous session, oldest first"""
+        pending = self.job_queue.pending()
+        if not pending:
+            return
+
+        InfoBar.info(
+            title='Resuming',
+            content=f'Resuming {len(pending)} unfinished paper checks',
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=3000,
+            parent=self
+        )
+        self.startBatch(BatchCheckThread(
+            None, self.text_cache, self.response_cache, self.job_queue, resume=True))
+
+    def startBatch(self, batch_thread):
+        self.selectFolderButton.setEnabled(False)
+        self.checkAllButton.setText("Stop Batch")
+        self.batch_thread = batch_thread
+        self.batch_thread.itemStatus.connect(self.onBatchItemStatus)
+        self.batch_thread.finished.connect(self.onBatchFinished)
+        self.batch_thread.start()
+
+    def onBatchItemStatus(self, batch_item):
+        """Show the state and timings of one batch item in the list"""
+        self.batch_results[path_key(batch_item.path)] = batch_item
+        folder = self.pdfModel.folder
+        if not folder or not path_key(batch_item.path).startswith(os.path.join(path_key(folder), "")):
+            return
+        name = os.path.relpath(os.path.abspath(batch_item.path), os.path.abspath(folder))
+
+        if batch_item.status in (DONE, FAILED):
+            self.pdfModel.setStatus(
+                name, f"{batch_item.status} in {batch_item.elapsed:.1f}s",
+                f"Extraction {batch_item.extract_time:.1f}s, analysis {batch_item.analyse_time:.1f}s"
+                + (f"\n{batch_item.error}" if batch_item.error else ""))
+        else:
+            self.pdfModel.setStatus(name, batch_item.status)
+
+    def onBatchFinished(self):
+        """Handle completion of a batch check"""
+        items = self.batch_thread.checker.items
+        done = sum(item.status == DONE for item in items)
+        failed = sum(item.status == FAILED for item in items)
+        cancelled = sum(item.status == CANCELLED for item in items)
+
+        InfoBar.success(
+            title='Batch Complete',
+            content=f'{done} checked, {failed} failed' + (f', {cancelled} cancelled' if cancelled else ''),
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=3000,
+            parent=self
+        )
+
+        self.selectFolderButton.setEnabled(True)
+        self.checkAllButton.setText("Check All")
+        self.checkAllButton.setEnabled(True)
+        self.batch_thread = None
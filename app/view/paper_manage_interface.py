@@ -1,10 +1,74 @@
-from PySide6.QtCore import Qt, QProcess
+import asyncio
+import os
+
+from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtWidgets import (QWidget, QFrame, QHBoxLayout, QVBoxLayout, 
-                              QSpacerItem, QSizePolicy, QTextEdit)
+                              QSpacerItem, QSizePolicy)
 from qfluentwidgets import (FluentIcon as FIF, SmoothScrollArea, TitleLabel, 
                            PrimaryPushButton, PushButton, SearchLineEdit)
 from ..components.del_dialog import DelDialog
-from ..common.config import PAGE, DOWN_DIR, YEAR
+from ..components.download_table import DownloadTable
+from ..components.log_console import LogConsole
+from ..common.bandwidth import BandwidthLimiter, daily_schedule
+from ..common.config import cfg, PAGE, DOWN_DIR, YEAR
+from ..common.download_engine import DownloadEngine, STARTED, DONE, SKIPPED_DUPLICATE, FAILED
+from ..common.download_scheduler import DownloadScheduler, COMPLETED, PAUSED
+from ..common.search_cache import SearchCache
+
+
+class DownloadThread(QThread):
+    """ Runs a DownloadScheduler on its own asyncio event loop """
+    event = Signal(object)              # Signal to emit DownloadEvents into the GUI thread
+    queryFinished = Signal(str, str, object)  # Signal to emit (query, outcome, detail) per query
+    error = Signal(str)                 # Signal to emit a failure of the whole run
+
+    def __init__(self, search_cache=None, bandwidth=None, parent=None):
+        super().__init__(parent)
+        self.scheduler = DownloadScheduler(
+            DOWN_DIR,
+            PAGE,
+            YEAR,
+            cfg.get(cfg.maxBlockNum),
+            cfg.get(cfg.perHostConnections),
+            cfg.get(cfg.scihubMirrors),
+            on_event=self.event.emit,
+            on_query_done=self.queryFinished.emit,
+            auto_speed_up=cfg.get(cfg.autoSpeedUp),
+            search_cache=search_cache,
+            bandwidth=bandwidth
+        )
+        self.loop = None
+        self.task = None
+        self.stopped = False
+
+    def accepting(self):
+        """Whether submit() can still add queries, i.e. the thread is not winding down"""
+        return not self.stopped and not self.scheduler.closed
+
+    def submit(self, query):
+        """Add a query to the downloads, before or after start(); False if this thread is winding down"""
+        return not self.stopped and self.scheduler.submit(query)
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.task = self.loop.create_task(self.scheduler.run())
+            if self.stopped:
+                self.task.cancel()
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        """Cancel (pause) every query from the GUI thread"""
+        self.stopped = True
+        if self.task is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.task.cancel)
+
 
 class PaperManageInterface(SmoothScrollArea):
     """ Paper Manage interface """
@@ -14,19 +78,23 @@ class PaperManageInterface(SmoothScrollArea):
 
         self.setObjectName("PaperManageInterface")
         self.status = 'paused'
-        self.process = QProcess()
-        # Set process channel mode to merge stdout and stderr
-        self.process.setProcessChannelMode(QProcess.MergedChannels)
-        self.process.readyReadStandardOutput.connect(self.handle_output)
-        self.process.readyReadStandardError.connect(self.handle_error)
-        # Add finished signal handler
-        self.process.finished.connect(self.handle_finished)
+        self.download_thread = None
+        self.discard_on_stop = False
+        # query -> [downloaded, failed] for the queries submitted to the running thread
+        self.query_counts = {}
+        # Search text of a Start pressed while the previous thread was still winding down
+        self.restart_query = None
+        self.search_cache = SearchCache(os.path.join(cfg.appPath, "cache", "scholar.db"))
+        # Shared by every download thread and updated live from the settings
+        self.bandwidth = BandwidthLimiter(*self.bandwidthSchedule())
         
         self.setupUi()
 
         self.allStartButton.clicked.connect(self.allStartTasks)
         self.allPauseButton.clicked.connect(self.allPauseTasks)
         self.allDeleteButton.clicked.connect(self.allDeleteTasks)
+        for item in (cfg.limitStartHour, cfg.limitEndHour, cfg.dayRateLimit, cfg.nightRateLimit):
+            item.valueChanged.connect(self.updateBandwidth)
 
         self.setWidget(self.scrollWidget)
         self.setWidgetResizable(True)
@@ -85,12 +153,17 @@ class PaperManageInterface(SmoothScrollArea):
         self.expandLayout.addWidget(self.title)
         self.scrollWidget.setMinimumWidth(816)
 
-        # Add text view for output
-        self.outputText = QTextEdit(self.scrollWidget)
-        self.outputText.setReadOnly(True)
-        self.outputText.setMinimumHeight(300)
+        # Add per-paper progress table
+        self.downloadTable = DownloadTable(self.scrollWidget)
+        self.downloadTable.setMinimumHeight(280)
+        self.expandLayout.addWidget(self.downloadTable)
+
+        # Add log view for output; the full log is also kept in logs/download.log
+        self.outputText = LogConsole(self.scrollWidget,
+                                     spill_path=os.path.join(cfg.appPath, "logs", "download.log"))
+        self.outputText.setMinimumHeight(200)
         self.outputText.setStyleSheet("""
-            QTextEdit {
+            QListView {
                 background-color: #f0f0f0;
                 border: 1px solid #ccc;
                 border-radius: 5px;
@@ -103,70 +176,126 @@ class PaperManageInterface(SmoothScrollArea):
         self.searchEdit.setPlaceholderText("Enter search query for papers")
         self.searchEdit.setMinimumWidth(300)
 
-    def handle_output(self):
-        """Handle process standard output"""
-        data = self.process.readAllStandardOutput()
-        text = bytes(data).decode('utf-8', errors='replace')
-        if text:
-            self.outputText.append(text.strip())
-            # Scroll to bottom
-            self.outputText.verticalScrollBar().setValue(
-                self.outputText.verticalScrollBar().maximum()
-            )
-
-    def handle_error(self):
-        """Handle process standard error"""
-        data = self.process.readAllStandardError()
-        text = bytes(data).decode('utf-8', errors='replace')
-        if text:
-            self.outputText.append(f"Error: {text.strip()}")
-            # Scroll to bottom
-            self.outputText.verticalScrollBar().setValue(
-                self.outputText.verticalScrollBar().maximum()
-            )
-
-    def handle_finished(self, exit_code, exit_status):
-        """Handle process completion"""
-        if exit_code == 0:
-            self.outputText.append("\nProcess completed successfully!")
+    def bandwidthSchedule(self):
+        return daily_schedule(cfg.get(cfg.limitStartHour), cfg.get(cfg.limitEndHour),
+                              cfg.get(cfg.dayRateLimit) * 1024, cfg.get(cfg.nightRateLimit) * 1024)
+
+    def updateBandwidth(self):
+        self.bandwidth.set_schedule(*self.bandwidthSchedule())
+
+    def log(self, text):
+        # Buffered; the console coalesces bursts and keeps itself scrolled to the end
+        self.outputText.append(text)
+
+    def handle_event(self, event):
+        """Handle a paper's download event"""
+        self.downloadTable.applyEvent(event)
+        paper = event.paper
+        counts = self.query_counts.setdefault(event.query, [0, 0])
+        if event.kind == STARTED:
+            self.log(f"Downloading: {paper.title}")
+        elif event.kind == DONE:
+            counts[0] += 1
+            self.log(f"Downloaded: {paper.title} ({event.received / 1024:.0f} KB in {event.elapsed:.1f}s)")
+        elif event.kind == SKIPPED_DUPLICATE:
+            self.log(f"Skipped: {paper.title} (already downloaded as {os.path.basename(event.path)})")
+        elif event.kind == FAILED:
+            counts[1] += 1
+            self.log(f"Error: {paper.title}: {event.error}")
+
+    def handle_query_finished(self, query, outcome, detail):
+        """Handle the end of one query's run"""
+        if self.sender() is not self.download_thread:
+            # A thread replaced by allStartTasks: its paused queries are being resumed
+            return
+        done, failed = self.query_counts.pop(query, [0, 0])
+        if outcome == PAUSED:
+            if not self.discard_on_stop:
+                self.log(f"\nDownload of '{query}' paused. Press Start to resume")
+        elif outcome != COMPLETED:
+            self.log(f"\nError: download of '{query}' failed: {detail}")
+        elif failed == 0:
+            self.log(f"\n'{query}' completed successfully! {done} papers downloaded")
         else:
-            self.outputText.append(f"\nProcess failed with exit code: {exit_code}")
+            self.log(f"\n'{query}' completed: {done} papers downloaded, {failed} failed")
+
+    def handle_error(self, message):
+        """Handle a failure of the whole download run"""
+        self.log(f"Error: {message}")
+
+    def handle_finished(self, thread):
+        """Handle the end of a download thread once all of its queries are over"""
+        if thread is not self.download_thread:
+            return
+        self.downloadTable.stop()
+        if self.discard_on_stop:
+            DownloadEngine(DOWN_DIR).discard()
+            self.discard_on_stop = False
+        self.query_counts = {}
+        self.download_thread = None
+        if self.restart_query is not None:
+            query, self.restart_query = self.restart_query, None
+            self.startDownloads(query)
 
     def allStartTasks(self):
-        query = self.searchEdit.text()
-        if not query:
-            self.outputText.append("Please enter a search query first!")
+        self.startDownloads(self.searchEdit.text().strip())
+
+    def startDownloads(self, query):
+        """Download query, or resume every paused run when it is empty"""
+        thread = self.download_thread
+        if thread is not None and not thread.accepting():
+            # Still winding down after a pause: start once it has saved its checkpoints
+            self.log("Waiting for the paused downloads to stop...")
+            self.restart_query = query
             return
-       
-        # Show the command being executed
-        program = "py"  
-        arguments = [
-            "-m", 
-            "PyPaperBot",
-            f"--query={query}",  # Removed extra quotes
-            f"--scholar-pages={PAGE}",
-            f"--min-year={YEAR}",
-            f"--dwn-dir={DOWN_DIR}",
-            "--scihub-mirror=https://sci-hub.do"
-        ]
-        
-        # Display the command that's being run
-        self.outputText.append(f"Start searching for papers and downloading...")
-        
-        # Set working directory and start the process
-        self.process.setWorkingDirectory(DOWN_DIR)
-        self.process.start(program, arguments)
+
+        engine = DownloadEngine(DOWN_DIR)
+        queries = [query] if query else engine.paused_queries()
+        if not queries:
+            self.log("Please enter a search query first!")
+            return
+
+        if thread is None:
+            thread = DownloadThread(self.search_cache, self.bandwidth, self)
+            thread.event.connect(self.handle_event)
+            thread.queryFinished.connect(self.handle_query_finished)
+            thread.error.connect(self.handle_error)
+            thread.finished.connect(lambda: self.handle_finished(thread))
+            self.download_thread = thread
+
+        for query in queries:
+            if query in self.query_counts:
+                self.log(f"'{query}' is already downloading")
+                continue
+            if not thread.submit(query):
+                # The scheduler ran out of work meanwhile; start again once the thread is done
+                self.restart_query = query if self.restart_query is None else ""
+                continue
+            if engine.can_resume(query):
+                self.log(f"Resuming paused download for '{query}'...")
+            else:
+                self.log(f"Start searching for '{query}' and downloading...")
+            self.query_counts[query] = [0, 0]
+
+        # Queries are submitted first, so the scheduler never starts out with nothing to do
+        if not thread.isRunning() and not thread.isFinished():
+            thread.start()
 
     def allPauseTasks(self):
-        if self.process.state() == QProcess.Running:
-            self.process.terminate()
-            self.outputText.append("Process terminated")
+        if self.download_thread:
+            self.download_thread.stop()
+            self.log("Pausing...")
 
     def allDeleteTasks(self):
         dialog = DelDialog(self.window())
         if dialog.exec():
             self.outputText.clear()
-            if self.process.state() == QProcess.Running:
-                self.process.terminate()
+            self.downloadTable.clear()
+            # Drop the paused state too, so the next Start begins a fresh search
+            if self.download_thread:
+                self.discard_on_stop = True
+                self.download_thread.stop()
+            else:
+                DownloadEngine(DOWN_DIR).discard()
 
         dialog.deleteLater()
@@ -4,7 +4,7 @@ import sys
 from PySide6.QtCore import Qt
 
 from PySide6.QtWidgets import QWidget,  QVBoxLayout
-from qfluentwidgets import FluentIcon as FIF, ComboBoxSettingCard
+from qfluentwidgets import FluentIcon as FIF, ComboBoxSettingCard, RangeSettingCard, SwitchSettingCard
 from qfluentwidgets import InfoBar
 from qfluentwidgets import (SettingCardGroup,  SmoothScrollArea,
                             setTheme)
@@ -45,6 +45,94 @@ class SettingInterface(SmoothScrollArea):
             parent=self.personalGroup
         )
 
+        # download
+        self.downloadGroup = SettingCardGroup(
+            "Download", self.scrollWidget)
+
+        self.maxBlockNumCard = RangeSettingCard(
+            cfg.maxBlockNum,
+            FIF.DOWNLOAD,
+            "Connection Budget",
+            "Connections shared by all queries that are downloading at once",
+            parent=self.downloadGroup
+        )
+
+        self.perHostConnectionsCard = RangeSettingCard(
+            cfg.perHostConnections,
+            FIF.GLOBE,
+            "Connections Per Host",
+            "Maximum number of open connections to any one server",
+            parent=self.downloadGroup
+        )
+
+        self.limitStartHourCard = RangeSettingCard(
+            cfg.limitStartHour,
+            FIF.HISTORY,
+            "Daytime Limit Starts",
+            "Hour of the day from which the daytime bandwidth limit applies",
+            parent=self.downloadGroup
+        )
+
+        self.limitEndHourCard = RangeSettingCard(
+            cfg.limitEndHour,
+            FIF.HISTORY,
+            "Daytime Limit Ends",
+            "Hour of the day from which the night bandwidth limit applies (24 for midnight)",
+            parent=self.downloadGroup
+        )
+
+        self.dayRateLimitCard = RangeSettingCard(
+            cfg.dayRateLimit,
+            FIF.SPEED_MEDIUM,
+            "Daytime Bandwidth Limit",
+            "Download speed limit in KB/s during the day (0 = unlimited)",
+            parent=self.downloadGroup
+        )
+
+        self.nightRateLimitCard = RangeSettingCard(
+            cfg.nightRateLimit,
+            FIF.SPEED_OFF,
+            "Night Bandwidth Limit",
+            "Download speed limit in KB/s outside the daytime hours (0 = unlimited)",
+            parent=self.downloadGroup
+        )
+
+        # paper check
+        self.checkGroup = SettingCardGroup(
+            "Paper Check", self.scrollWidget)
+
+        self.extractWorkersCard = RangeSettingCard(
+            cfg.extractWorkers,
+            FIF.SPEED_HIGH,
+            "Extraction Processes",
+            "Number of processes used to extract text from PDF pages",
+            parent=self.checkGroup
+        )
+
+        self.maxInFlightCard = RangeSettingCard(
+            cfg.maxInFlight,
+            FIF.SEND,
+            "Concurrent Analysis Requests",
+            "Maximum number of analysis requests in flight at once",
+            parent=self.checkGroup
+        )
+
+        self.batchWorkersCard = RangeSettingCard(
+            cfg.batchWorkers,
+            FIF.LIBRARY,
+            "Batch Check Workers",
+            "Number of papers checked at the same time by Check All",
+            parent=self.checkGroup
+        )
+
+        self.scanSubfoldersCard = SwitchSettingCard(
+            FIF.FOLDER,
+            "Include Subfolders",
+            "List the PDFs in subfolders of the selected folder too",
+            configItem=cfg.scanSubfolders,
+            parent=self.checkGroup
+        )
+
         # application
 
         self.__initWidget()
@@ -74,11 +162,24 @@ class SettingInterface(SmoothScrollArea):
             self.personalGroup.addSettingCard(self.backgroundEffectCard)
         self.personalGroup.addSettingCard(self.zoomCard)
 
+        self.downloadGroup.addSettingCard(self.maxBlockNumCard)
+        self.downloadGroup.addSettingCard(self.perHostConnectionsCard)
+        self.downloadGroup.addSettingCard(self.limitStartHourCard)
+        self.downloadGroup.addSettingCard(self.limitEndHourCard)
+        self.downloadGroup.addSettingCard(self.dayRateLimitCard)
+        self.downloadGroup.addSettingCard(self.nightRateLimitCard)
+
+        self.checkGroup.addSettingCard(self.extractWorkersCard)
+        self.checkGroup.addSettingCard(self.maxInFlightCard)
+        self.checkGroup.addSettingCard(self.batchWorkersCard)
+        self.checkGroup.addSettingCard(self.scanSubfoldersCard)
 
         # add setting card group to layout
         self.expandLayout.setSpacing(20)
         self.expandLayout.setContentsMargins(36, 30, 36, 30)
         self.expandLayout.addWidget(self.personalGroup)
+        self.expandLayout.addWidget(self.downloadGroup)
+        self.expandLayout.addWidget(self.checkGroup)
 
     def __showRestartTooltip(self):
         """ show restart tooltip """
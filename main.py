@@ -1,93 +1,103 @@
+import multiprocessing
 import os
 
 import sys
 
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QIcon
-from qfluentwidgets import qconfig
 
-from app.common.config import cfg
+if __name__ == "__main__":
+    # Extraction workers are spawned processes; keep them from starting the GUI again
+    multiprocessing.freeze_support()
 
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtGui import QIcon
+    from qfluentwidgets import qconfig
 
-if "--debug" in sys.argv:
-    cfg.appPath = "./"
-    qconfig.load('./NobleBlocks Settings.json', cfg)
-else:  
-    cfg.appPath = os.path.dirname(sys.executable)
-    qconfig.load('{}/NobleBlocks Settings.json'.format(os.path.dirname(sys.executable)), cfg)
+    from app.common.config import cfg
 
-    def exceptionHandler(type, value, traceback):  
-        logger.exception(f"Unexpected error! {type}: {value}. Traceback: {traceback}")
 
-    sys.excepthook = exceptionHandler
+    if "--debug" in sys.argv:
+        cfg.appPath = "./"
+        qconfig.load('./NobleBlocks Settings.json', cfg)
+    else:  
+        cfg.appPath = os.path.dirname(sys.executable)
+        qconfig.load('{}/NobleBlocks Settings.json'.format(os.path.dirname(sys.executable)), cfg)
 
-if cfg.get(cfg.dpiScale) == "Auto":
-    pass
-else:
-    os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "0"
-    os.environ["QT_SCALE_FACTOR"] = str(cfg.get(cfg.dpiScale))
+        def exceptionHandler(type, value, traceback):  
+            logger.exception(f"Unexpected error! {type}: {value}. Traceback: {traceback}")
 
-app = QApplication(sys.argv)
+        sys.excepthook = exceptionHandler
 
-# Set application icon
-if getattr(sys, 'frozen', False):
-    # If the application is run as a bundle (frozen)
-    application_path = sys._MEIPASS
-else:
-    # If the application is run from a Python interpreter
-    application_path = os.path.dirname(os.path.abspath(__file__))
+    if cfg.get(cfg.dpiScale) == "Auto":
+        pass
+    else:
+        os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "0"
+        os.environ["QT_SCALE_FACTOR"] = str(cfg.get(cfg.dpiScale))
 
-icon_path = os.path.join(application_path, "images", "logo.ico")
-app.setWindowIcon(QIcon(icon_path))
+    app = QApplication(sys.argv)
 
-from PySide6.QtCore import QSharedMemory
+    # Set application icon
+    if getattr(sys, 'frozen', False):
+        # If the application is run as a bundle (frozen)
+        application_path = sys._MEIPASS
+    else:
+        # If the application is run from a Python interpreter
+        application_path = os.path.dirname(os.path.abspath(__file__))
 
+    icon_path = os.path.join(application_path, "images", "logo.ico")
+    app.setWindowIcon(QIcon(icon_path))
 
-sharedMemory = QSharedMemory()
-sharedMemory.setKey("NobleBlocks")
+    from PySide6.QtCore import QSharedMemory
 
-if sharedMemory.attach(): 
-    if sys.platform == "win32":
-        import win32gui
-        import win32con
 
-        hWnd = win32gui.FindWindow(None, "NobleBlocks")
-        win32gui.ShowWindow(hWnd, 1)
+    sharedMemory = QSharedMemory()
+    sharedMemory.setKey("NobleBlocks")
 
-        win32gui.SendMessage(hWnd, win32con.WM_USER + 1, 0, 0)
+    if sharedMemory.attach(): 
+        if sys.platform == "win32":
+            import win32gui
+            import win32con
 
-        win32gui.SetForegroundWindow(hWnd)
+            hWnd = win32gui.FindWindow(None, "NobleBlocks")
+            win32gui.ShowWindow(hWnd, 1)
 
-    sys.exit(-1)
+            win32gui.SendMessage(hWnd, win32con.WM_USER + 1, 0, 0)
 
-sharedMemory.create(1)
+            win32gui.SetForegroundWindow(hWnd)
 
-import warnings
+        sys.exit(-1)
 
-import darkdetect
+    sharedMemory.create(1)
 
-from loguru import logger
-from qframelesswindow.utils import getSystemAccentColor
-from qfluentwidgets import setTheme, Theme, setThemeColor
-from app.view.main_window import MainWindow
+    import warnings
 
+    import darkdetect
 
-warnings.warn = logger.warning
+    from loguru import logger
+    from qframelesswindow.utils import getSystemAccentColor
+    from qfluentwidgets import setTheme, Theme, setThemeColor
+    from app.common.paper_check import shutdown_extract_pool
+    from app.view.main_window import MainWindow
 
-# Enable Theme
-setTheme(Theme.DARK if darkdetect.isDark() else Theme.LIGHT, save=False)
 
+    warnings.warn = logger.warning
 
-if sys.platform == "win32" or "darwin":
-    setThemeColor(getSystemAccentColor(), save=False)
+    # Enable Theme
+    setTheme(Theme.DARK if darkdetect.isDark() else Theme.LIGHT, save=False)
 
 
-w = MainWindow()
+    if sys.platform == "win32" or "darwin":
+        setThemeColor(getSystemAccentColor(), save=False)
 
-try:  
-    if "--silence" in sys.argv:
-        w.hide()
-except:
-    w.show()
 
-sys.exit(app.exec())
+    # Extraction worker processes must not outlive the GUI
+    app.aboutToQuit.connect(shutdown_extract_pool)
+
+    w = MainWindow()
+
+    try:  
+        if "--silence" in sys.argv:
+            w.hide()
+    except:
+        w.show()
+
+    sys.exit(app.exec())
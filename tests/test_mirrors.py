@@ -0,0 +1,118 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.common.mirrors import CLOSED, HALF_OPEN, OPEN, MirrorManager, MirrorUnavailable
+
+MIRRORS = ["https://a.test", "https://b.test", "https://c.test"]
+
+
+class FakeMirrors:
+    """ MockTransport handler serving every mirror with injected failures and latency
+
+    Latency is simulated by advancing a fake clock, which the manager and its
+    breakers read instead of time.monotonic().
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.down = set()
+        self.latency = {}
+        self.requests = []
+
+    def clock(self):
+        return self.now
+
+    def __call__(self, request):
+        host = f"{request.url.scheme}://{request.url.host}"
+        self.requests.append(host)
+        self.now += self.latency.get(host, 0.1)
+        if host in self.down:
+            return httpx.Response(503)
+        return httpx.Response(200, text=host)
+
+
+def run(fake, manager, calls=1):
+    """Fetch through manager.call() calls times; return the mirrors that answered"""
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(fake)) as client:
+            async def fetch(mirror):
+                response = await client.get(mirror + "/paper")
+                response.raise_for_status()
+                return response.text
+
+            return [await manager.call(fetch) for _ in range(calls)]
+
+    return asyncio.run(main())
+
+
+def manager_for(fake):
+    return MirrorManager(MIRRORS, failure_threshold=3, reset_timeout=60.0, clock=fake.clock)
+
+
+def test_failed_mirror_falls_back_to_the_next():
+    fake = FakeMirrors()
+    manager = manager_for(fake)
+    fake.down.add("https://a.test")
+    assert run(fake, manager) == ["https://b.test"]
+    assert fake.requests == ["https://a.test", "https://b.test"]
+
+
+def test_repeated_failures_trip_the_breaker():
+    fake = FakeMirrors()
+    manager = manager_for(fake)
+    fake.down.update(MIRRORS)
+    for _ in range(2):
+        with pytest.raises(MirrorUnavailable):
+            run(fake, manager)
+    assert all(mirror.breaker.state == CLOSED for mirror in manager.mirrors)
+    with pytest.raises(MirrorUnavailable):
+        run(fake, manager)
+    assert all(mirror.breaker.state == OPEN for mirror in manager.mirrors)
+    assert fake.requests == MIRRORS * 3
+
+    # Open breakers are skipped without a request until the cool-down is over
+    fake.down.clear()
+    fake.requests.clear()
+    with pytest.raises(MirrorUnavailable):
+        run(fake, manager)
+    assert fake.requests == []
+
+
+def test_cooldown_lets_a_trial_request_through():
+    fake = FakeMirrors()
+    manager = manager_for(fake)
+    a = manager.mirrors[0]
+    for _ in range(3):
+        a.record(False)
+    assert a.breaker.state == OPEN
+    assert a not in manager.ordered()
+
+    fake.now += 60.0
+    assert a in manager.ordered()
+    assert a.breaker.state == HALF_OPEN
+    # A failed trial opens the breaker again for another cool-down
+    a.record(False)
+    assert a.breaker.state == OPEN
+    assert a not in manager.ordered()
+
+    fake.now += 60.0
+    fake.down = {"https://b.test", "https://c.test"}
+    assert run(fake, manager) == ["https://a.test"]
+    assert a.breaker.state == CLOSED
+
+
+def test_faster_mirror_is_preferred():
+    fake = FakeMirrors()
+    manager = manager_for(fake)
+    fake.latency = {"https://a.test": 2.0, "https://b.test": 1.0, "https://c.test": 0.2}
+    for mirror in manager.mirrors:
+        mirror.record(True, fake.latency[mirror.url])
+    assert run(fake, manager, calls=2) == ["https://c.test", "https://c.test"]
+
+    # Once the fastest mirror starts failing, the next best one takes over
+    fake.down.add("https://c.test")
+    fake.requests.clear()
+    assert run(fake, manager) == ["https://b.test"]
+    assert fake.requests == ["https://c.test", "https://b.test"]
@@ -0,0 +1,67 @@
+import asyncio
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.common.segmented_download import IncompleteDownload, SegmentedDownload
+
+DATA = b"%PDF-1.4\n" + bytes(range(256)) * 8192
+
+
+class TruncatingHandler(BaseHTTPRequestHandler):
+    """ Serves DATA, cutting the first `truncate` ranged responses to half their length """
+    protocol_version = "HTTP/1.1"
+    truncate = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers["Range"])
+        start = int(match.group(1))
+        end = int(match.group(2)) + 1 if match.group(2) else len(DATA)
+        body = DATA[start:end]
+        server = self.server
+        with server.lock:
+            short = server.truncate > 0
+            server.truncate -= short
+        if short:
+            body = body[:len(body) // 2]
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{start + len(body) - 1}/{len(DATA)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TruncatingHandler)
+    server.lock = threading.Lock()
+    server.truncate = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def download(server, path):
+    async with httpx.AsyncClient() as client:
+        url = f"http://127.0.0.1:{server.server_port}/paper.pdf"
+        return await SegmentedDownload(client, url, path, len(DATA), 2, auto_scale=False).run()
+
+
+def test_short_responses_are_retried(server, tmp_path):
+    server.truncate = 2
+    path = tmp_path / "paper.pdf.part"
+    assert asyncio.run(download(server, path)) == len(DATA)
+    assert path.read_bytes() == DATA
+
+
+def test_persistently_short_responses_raise(server, tmp_path):
+    server.truncate = 1000
+    with pytest.raises(IncompleteDownload):
+        asyncio.run(download(server, tmp_path / "paper.pdf.part"))